@@ -96,6 +96,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file rather than :memory:, so tests can fork processes that share it (store.tests)
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        # Take the write lock when a transaction starts: concurrent checkouts then wait their turn
+        # (up to `timeout` seconds) instead of failing with "database is locked" on lock upgrade
+        'OPTIONS': {'transaction_mode': 'IMMEDIATE', 'timeout': 20},
     }
 }
 
@@ -123,6 +128,57 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Media files (Product Images)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Public origin of media in API responses, e.g. a CDN (https://cdn.example.com/media/); empty = the request's host
+MEDIA_BASE_URL = os.environ.get('MEDIA_BASE_URL', '')
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    # Model uploads, named by content hash (see core/storage.py)
+    'uploads': {'BACKEND': 'core.storage.ContentAddressedStorage'},
+}
+
+# --- CACHE ---
+# The store's response cache and its version counters must be shared by every
+# worker process, so production sets REDIS_URL; local memory is only correct
+# for a single process (runserver).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+# store.response_cache: endpoint -> timeout in seconds (0 or missing disables it)
+STORE_RESPONSE_CACHE = {
+    'products': 300,
+    'categories': 3600,
+    'collections': 3600,
+    'stock': 2,  # Plain TTL, no versions: stock moves with every order
+}
+
+# --- STORE: IN-MEMORY CATALOG INDEXES ---
+# Touched by `manage.py rebuild_catalog_indexes` so every worker process reloads them
+STORE_INDEX_STAMP_FILE = os.path.join(BASE_DIR, 'var', 'store_indexes.stamp')
+# Answer gender/category/collection/badge/color/size filters from store.bitmap
+STORE_BITMAP_INDEX = True
+# store.tasks: background worker threads per process; eager runs tasks inline
+STORE_TASK_WORKERS = 1
+STORE_TASKS_EAGER = False
+# Storefront page paths (under FRONTEND_URL) used in sitemaps and product feeds; see store.sitemaps
+STORE_FRONTEND_PATHS = {
+    'product': '/product/{slug}',
+    'category': '/category/{slug}',
+    'collection': '/collection/{slug}',
+}
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
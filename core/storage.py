@@ -0,0 +1,194 @@
+"""
+Content-addressed storage for model uploads (STORAGES['uploads']).
+
+Uploads are named after a hash of their bytes, inside the field's upload_to
+directory: products/3f1a...c9.jpg. Uploading the same file again reuses the
+existing file instead of writing crewneck_6SWbPks.jpg next to it, and a
+name never points at different content, so those URLs (and the
+store.derivatives files derived from them) can be cached forever:
+
+    location ~ "^/media/.+/[0-9a-f]{32}(-[0-9a-f]{8}-\\d+w)?\\.\\w+$" {
+        add_header Cache-Control "public, max-age=31536000, immutable";
+    }
+
+`serve_media` does the same when Django serves media itself (DEBUG).
+Serializers build file URLs with `media_urls(request)`, from MEDIA_BASE_URL
+(e.g. a CDN in front of the media origin) when set.
+Since files are shared between rows, replaced or deleted rows never delete
+their file; `manage.py sweep_orphaned_media` removes unreferenced ones.
+"""
+import hashlib
+import os
+import posixpath
+import re
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, storages
+from django.db.models import FileField, Q
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.encoding import filepath_to_uri
+from django.views.static import serve
+
+DERIVATIVES = 'derivatives'  # store.derivatives writes resized copies of uploads under here
+# <stem>[-<rendition>]-<width>w.<format>; see store.derivatives.derivative_name
+DERIVATIVE_SUFFIX = re.compile(r'(?:-(?P<rendition>[0-9a-f]{8}))?-\d+w\.\w+$')
+HASH_LENGTH = 32  # hex digits of sha256 kept in the name (128 bits)
+# Originals, and derivatives whose name carries their rendering settings
+IMMUTABLE_NAME = re.compile(r'/[0-9a-f]{%d}(-[0-9a-f]{8}-\d+w)?\.\w+$' % HASH_LENGTH)
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def content_name(name, content):
+    """`name` with its file name replaced by the hash of `content` (extension kept, lowercased)."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    directory, basename = posixpath.split(name)
+    return posixpath.join(directory, digest.hexdigest()[:HASH_LENGTH] + os.path.splitext(basename)[1].lower())
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = content_name(self.generate_filename(name), content)
+        if self.exists(name):
+            # Same bytes are already stored under this name. A fresh mtime keeps orphans()
+            # from sweeping a file that was unreferenced until this upload
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length=max_length)
+
+
+def upload_storage():
+    """Storage of every ImageField/FileField (a callable, so migrations don't pin the backend)."""
+    return storages['uploads']
+
+
+class MediaURLs:
+    """
+    Absolute URLs of stored file names under one media base, memoized.
+
+    Equivalent to request.build_absolute_uri(field_file.url) for filesystem
+    storage, without re-reading the host headers or calling the storage
+    backend per file. With another backend (S3, ...), set MEDIA_BASE_URL to
+    its public base.
+    """
+
+    def __init__(self, base):
+        self.base = base.rstrip('/') + '/'
+        self._urls = {}
+
+    def __call__(self, name):
+        url = self._urls.get(name)
+        if url is None:
+            url = self._urls[name] = self.base + filepath_to_uri(name).lstrip('/')
+        return url
+
+
+def media_urls(request):
+    """
+    The MediaURLs of `request`, created on first use: files are served from
+    settings.MEDIA_BASE_URL (a CDN origin) when set, else from the request's host.
+    """
+    builder = getattr(request, '_media_urls', None)
+    if builder is None:
+        base = getattr(settings, 'MEDIA_BASE_URL', '') or request.build_absolute_uri(settings.MEDIA_URL)
+        builder = request._media_urls = MediaURLs(base)
+    return builder
+
+
+def serve_media(request, path, document_root=None, show_indexes=False):
+    """django.views.static.serve, marking content-addressed files immutable."""
+    response = serve(request, path, document_root=document_root, show_indexes=show_indexes)
+    if response.status_code == 200 and IMMUTABLE_NAME.search('/' + path):
+        patch_cache_control(response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return response
+
+
+# --- Orphan sweeping ---
+def upload_fields():
+    """(model, field name) of every FileField/ImageField kept in upload storage."""
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, FileField) and field.storage is storages['uploads']
+    ]
+
+
+def _walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for child in directories:
+        yield from _walk(storage, posixpath.join(directory, child))
+
+
+def orphans(min_age=timedelta(days=1), renditions=None):
+    """
+    Yield stored files no row references (nor derivatives of such files, nor,
+    given `renditions` ({source stem: renditions in use}), derivatives of
+    other renditions), in the upload directories only, older than `min_age`
+    so uploads whose row hasn't committed yet are left alone.
+    """
+    storage = storages['uploads']
+    referenced = set()
+    directories = set()
+    for model, field in upload_fields():
+        directories.add(model._meta.get_field(field).upload_to.strip('/').split('/')[0])
+        referenced.update(
+            model._default_manager.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+            .values_list(field, flat=True).iterator()
+        )
+    stems = {os.path.splitext(name)[0] for name in referenced}
+    cutoff = timezone.now() - min_age
+
+    for top in sorted(directories) + [posixpath.join(DERIVATIVES, top) for top in sorted(directories)]:
+        if not storage.exists(top):
+            continue
+        for name in _walk(storage, top):
+            if name.startswith(DERIVATIVES + '/'):
+                relative = name[len(DERIVATIVES) + 1:]
+                suffix = DERIVATIVE_SUFFIX.search(relative)
+                stem = relative[:suffix.start()] if suffix else None
+                if stem in stems and (renditions is None or suffix['rendition'] in renditions.get(stem, ())):
+                    continue
+            elif name in referenced:
+                continue
+            if storage.get_modified_time(name) < cutoff:
+                yield name
+
+
+def still_referenced(names, renditions=None):
+    """
+    The `names` (orphans() results) some row references by now, directly or
+    as the original of a derivative; checked again right before deleting.
+    Derivatives of a rendition that `renditions` (as for orphans()) knows is
+    out of use for their source stay unreferenced.
+    """
+    originals = [name for name in names if not name.startswith(DERIVATIVES + '/')]
+    by_stem = {}
+    for name in names:
+        if name.startswith(DERIVATIVES + '/'):
+            relative = name[len(DERIVATIVES) + 1:]
+            suffix = DERIVATIVE_SUFFIX.search(relative)
+            stem = relative[:suffix.start()] if suffix else relative
+            if renditions is None or stem not in renditions or suffix['rendition'] in renditions[stem]:
+                by_stem.setdefault(stem, []).append(name)
+    found = set()
+    for model, field in upload_fields():
+        condition = Q(**{f'{field}__in': originals})
+        for stem in by_stem:
+            condition |= Q(**{f'{field}__startswith': stem + '.'})
+        for value in model._default_manager.filter(condition).values_list(field, flat=True).iterator():
+            found.add(value)
+            found.update(by_stem.get(os.path.splitext(value)[0], ()))
+    return found.intersection(names)
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from core.storage import serve_media
 
 # We don't have the router setup yet, so we will comment it out for now to avoid errors
 # from web_content.views import WebContentViewSet
@@ -21,6 +22,6 @@ urlpatterns = [
 ]
 
 
-# Serve media files in development (images)
+# Serve media files in development (images); content-addressed ones as immutable
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:57
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_refunded_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='orderitem',
+            name='return_proof_video',
+            field=models.FileField(blank=True, null=True, storage=core.storage.upload_storage, upload_to='returns/videos/'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from store.models import ProductVariant,Coupon
+from core.storage import upload_storage
 
 # --- CART MODELS ---
 class Cart(models.Model):
@@ -96,7 +97,7 @@ class OrderItem(models.Model):
 
     # Proof / Reason for specific item
     return_reason = models.TextField(blank=True, null=True)
-    return_proof_video = models.FileField(upload_to='returns/videos/', blank=True, null=True)
+    return_proof_video = models.FileField(upload_to='returns/videos/', storage=upload_storage, blank=True, null=True)
     admin_comment = models.TextField(blank=True, null=True)
 
     # Coupon for this specific item exchange
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from .models import Cart, CartItem, Order, OrderItem
 from accounts.models import SavedAddress
 from store.models import ProductImage, Product
+from core.storage import media_urls
 
 # ==========================================
 # 1. CART SERIALIZERS
@@ -25,7 +26,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         if image and image.image:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(image.image.url)
+                return media_urls(request)(image.image.name)
             return image.image.url
         return None
 
@@ -79,7 +80,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
                 try:
                     request = self.context.get('request')
                     if request:
-                        return request.build_absolute_uri(image_obj.image.url)
+                        return media_urls(request)(image_obj.image.name)
                     return image_obj.image.url
                 except:
                     return image_obj.image.url
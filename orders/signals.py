@@ -1,8 +1,9 @@
-from django.db.models.signals import pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils.crypto import get_random_string
 from django.utils import timezone
-from .models import OrderItem
+from .models import Order, OrderItem
+from store import stats
 from store.models import Coupon
 
 
@@ -34,3 +35,16 @@ def handle_item_exchange(sender, instance, **kwargs):
         instance.exchange_coupon = coupon
         print(f"✅ Generated Coupon {code} for Item #{instance.id}")
 
+
+# Keep Product.units_sold_30d (the "popularity" sort key) in step with orders
+@receiver([post_save, post_delete], sender=OrderItem)
+def refresh_item_sales(sender, instance, **kwargs):
+    stats.refresh_sales([instance.product_name])
+
+
+@receiver(post_save, sender=Order)
+def refresh_order_sales(sender, instance, created, **kwargs):
+    # Payment/cancellation changes decide whether the order's lines count as sales
+    if not created:
+        stats.refresh_sales(instance.items.values_list('product_name', flat=True))
+
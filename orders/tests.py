@@ -1,3 +1,51 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import CustomUser
+from store.models import Category, Color, Product, ProductVariant, Size
+
+
+@override_settings(STORE_TASKS_EAGER=True)
+class CheckoutTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name='Polo Tshirts', gender='Men')
+        self.product = Product.objects.create(
+            title='Classic Polo', description='', gender='Men', category=category, price=499,
+            features='', care_instructions='',
+        )
+        self.variants = [
+            ProductVariant.objects.create(
+                product=self.product, color=Color.objects.create(name=name, hex_code='#000000'),
+                size=Size.objects.create(name='M'), stock=5,
+            )
+            for name in ('Navy', 'Black')
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create(email='buyer@example.com'))
+
+    def checkout(self, *quantities):
+        lines = [
+            {'product_id': variant.product_id, 'color': variant.color.name, 'size': 'M', 'quantity': quantity}
+            for variant, quantity in zip(self.variants, quantities)
+        ]
+        return self.client.post('/api/orders/checkout/', {'items': lines, 'payment_method': 'COD'}, format='json')
+
+    def stock(self):
+        return [ProductVariant.objects.get(pk=variant.pk).stock for variant in self.variants]
+
+    def test_cod_takes_stock_for_every_line(self):
+        response = self.checkout(2, '3')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(self.stock(), [3, 2])
+
+    def test_rejects_bad_quantities(self):
+        for quantity in (-3, 0, 'two', 1.5, True):
+            response = self.checkout(1, quantity)
+            self.assertEqual(response.status_code, 400, quantity)
+        self.assertEqual(self.stock(), [5, 5])
+
+    def test_short_line_takes_nothing(self):
+        response = self.checkout(2, 6)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Black', response.data['error'])
+        self.assertEqual(self.stock(), [5, 5])
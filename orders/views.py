@@ -1,14 +1,17 @@
+import logging
 import razorpay
 from decimal import Decimal
 from django.conf import settings
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Q
 from rest_framework import generics, status, views, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from django.utils import timezone
 from .models import Cart, CartItem, Order, OrderItem
 from .serializers import CartSerializer, OrderSerializer, SavedAddressSerializer
+from store import inventory, stats
 from store.models import Product, ProductVariant, SiteConfig
 from accounts.models import SavedAddress
 
@@ -19,6 +22,8 @@ from payments.razorpay_client import (
     verify_payment_signature 
 )
 
+logger = logging.getLogger(__name__)
+
 # Initialize Client
 client = razorpay.Client(auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET))
 
@@ -104,28 +109,53 @@ class VerifyPaymentView(views.APIView):
         order.razorpay_payment_id = razorpay_payment_id
         order.save()
 
-        # Deduct Stock
-        for item in order.items.all():
+        # Deduct Stock: match lines to variants in one query, take it in one conditional UPDATE
+        items = list(order.items.all())
+        keys = {}
+        wanted = Q()
+        for item in items:
+            parts = item.variant_label.split(' / ')
+            if len(parts) == 2:
+                keys[item.pk] = (item.product_name, parts[0], parts[1])
+                wanted |= Q(product__title=item.product_name, color__name=parts[0], size__name=parts[1])
+        variants = {}
+        if keys:
+            variants = {
+                (variant.product.title, variant.color.name, variant.size.name): variant
+                for variant in ProductVariant.objects.filter(wanted).select_related("product", "color", "size")
+            }
+
+        demand = {}
+        lines = {}  # variant pk -> its order lines, to report shortages
+        for item in items:
+            if item.quantity < 1:
+                continue
+            variant = variants.get(keys.get(item.pk))
+            if variant is None:
+                logger.warning("Stock Deduction Error for item %s: no variant %r", item, item.variant_label)
+                continue
+            demand[variant.pk] = demand.get(variant.pk, 0) + item.quantity
+            lines.setdefault(variant.pk, []).append(item)
+
+        # The payment is captured either way: take what is in stock, report the rest for staff to resolve
+        short = []
+        while demand:
             try:
-                parts = item.variant_label.split(' / ')
-                if len(parts) == 2:
-                    color_name = parts[0]
-                    size_name = parts[1]
-                    
-                    variant = ProductVariant.objects.select_for_update().get(
-                        product__title=item.product_name,
-                        color__name=color_name,
-                        size__name=size_name
-                    )
-                    
-                    if variant.stock >= item.quantity:
-                        variant.stock -= item.quantity
-                        variant.save()
-            except Exception as e:
-                print(f"Stock Deduction Error for item {item}: {e}")
+                inventory.decrement(demand)
+                break
+            except inventory.OutOfStock as exc:
+                short += exc.variant_ids
+                demand = {pk: quantity for pk, quantity in demand.items() if pk not in exc.variant_ids}
+        if demand:
+            inventory.stock_changed([variant for variant in variants.values() if variant.pk in demand], demand)
+        out_of_stock = [f"{item.product_name} ({item.variant_label})" for pk in short for item in lines[pk]]
+        if out_of_stock:
+            logger.warning("Order #%s paid with lines out of stock: %s", order.pk, "; ".join(out_of_stock))
 
         Cart.objects.filter(user=request.user).delete()
-        return Response({"message": "Payment verified and Order Placed"}, status=status.HTTP_200_OK)
+        return Response(
+            {"message": "Payment verified and Order Placed", "out_of_stock": out_of_stock}, status=status.HTTP_200_OK
+        )
 
 # ==========================================
 # 3. ACTIONS
@@ -217,36 +247,51 @@ class CheckoutView(views.APIView):
         subtotal = Decimal("0.00")
         order_line_items = []
 
-        # 2. Process Items
+        # 2. Resolve every line in one query, keyed by (product id, color, size)
+        lines = []
         for line in items_payload:
             raw_id = line.get("product_id")
-            size_name = line.get("size")
-            color_name = line.get("color") 
-            quantity = int(line.get("quantity", 1) or 1)
-            
             if not raw_id:
                 return Response({"error": "Product ID is missing"}, status=status.HTTP_400_BAD_REQUEST)
-
             try:
-                product_obj = Product.objects.get(id=raw_id)
-            except Product.DoesNotExist:
+                product_id = int(raw_id)
+            except (TypeError, ValueError):
                 return Response({"error": f"Product ID {raw_id} not found"}, status=status.HTTP_400_BAD_REQUEST)
-
-            try:
-                variant = ProductVariant.objects.get(
-                    product=product_obj, 
-                    size__name=size_name, 
-                    color__name=color_name
-                )
-            except ProductVariant.DoesNotExist:
+            quantity = line.get("quantity")
+            if quantity is None:
+                quantity = 1
+            elif isinstance(quantity, str) and quantity.strip().isdigit():
+                quantity = int(quantity)
+            if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+                return Response({"error": f"Invalid quantity for product {raw_id}"}, status=status.HTTP_400_BAD_REQUEST)
+            lines.append((product_id, line.get("color"), line.get("size"), quantity))
+
+        wanted = Q()
+        for product_id, color_name, size_name, _ in lines:
+            wanted |= Q(product_id=product_id, color__name=color_name, size__name=size_name)
+        variants = {
+            (variant.product_id, variant.color.name, variant.size.name): variant
+            for variant in ProductVariant.objects.filter(wanted).select_related("product", "color", "size")
+        }
+
+        demand = {}  # variant pk -> units, summed over lines naming the same variant
+        labels = {}
+        for product_id, color_name, size_name, quantity in lines:
+            variant = variants.get((product_id, color_name, size_name))
+            if variant is None:
+                title = Product.objects.filter(pk=product_id).values_list("title", flat=True).first()
+                if title is None:
+                    return Response({"error": f"Product ID {product_id} not found"}, status=status.HTTP_400_BAD_REQUEST)
                 return Response(
-                    {"error": f"Variant unavailable: {product_obj.title} ({color_name}/{size_name})"}, 
+                    {"error": f"Variant unavailable: {title} ({color_name}/{size_name})"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            if variant.stock < quantity:
+            demand[variant.pk] = demand.get(variant.pk, 0) + quantity
+            labels[variant.pk] = f"{variant.product.title} ({color_name}/{size_name})"
+            if variant.stock < demand[variant.pk]:
                 return Response(
-                    {"error": f"Out of stock: {variant.product.title} ({color_name}/{size_name})"},
+                    {"error": f"Out of stock: {labels[variant.pk]}"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
@@ -258,7 +303,6 @@ class CheckoutView(views.APIView):
                 "variant_label": f"{color_name} / {size_name}", 
                 "price": final_price,
                 "quantity": quantity,
-                "variant_obj": variant
             })
 
         # 3. Totals
@@ -269,7 +313,17 @@ class CheckoutView(views.APIView):
         if payment_method == 'COD':
             total_amount += cod_fee
 
-        # 4. Create Order
+        # 4. Take COD stock now, in one conditional UPDATE (online orders take it once paid)
+        if payment_method == 'COD':
+            try:
+                inventory.decrement(demand)
+            except inventory.OutOfStock as exc:
+                # A concurrent checkout took the stock read above
+                short = ", ".join(labels[pk] for pk in exc.variant_ids)
+                return Response({"error": f"Out of stock: {short}"}, status=status.HTTP_400_BAD_REQUEST)
+            inventory.stock_changed([variant for variant in variants.values() if variant.pk in demand], demand)
+
+        # 5. Create Order
         first_name = request.data.get('firstName') or request.data.get('first_name', '')
         last_name = request.data.get('lastName') or request.data.get('last_name', '')
         address = request.data.get('address', '')
@@ -316,21 +370,11 @@ class CheckoutView(views.APIView):
                 is_default=True
             )
 
-        for item in order_line_items:
-            OrderItem.objects.create(
-                order=order,
-                product_name=item["product_name"],
-                variant_label=item["variant_label"],
-                price=item["price"],
-                quantity=item["quantity"],
-            )
-            
-            if payment_method == 'COD':
-                variant = item['variant_obj']
-                variant.stock -= item['quantity']
-                variant.save()
+        OrderItem.objects.bulk_create([OrderItem(order=order, **item) for item in order_line_items])
+        # bulk_create skips the post_save in orders/signals.py that keeps the sales sort key current
+        stats.refresh_sales(item["product_name"] for item in order_line_items)
 
-        # 5. Response Logic
+        # 6. Response Logic
         if payment_method == 'COD':
             Cart.objects.filter(user=request.user).delete()
             return Response({
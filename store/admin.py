@@ -28,6 +28,10 @@ class ProductAdmin(admin.ModelAdmin):
         models.ManyToManyField: {'widget': CheckboxSelectMultiple},
     }
 
+    def get_queryset(self, request):
+        # `in_stock` and `category` in list_display would otherwise query per row
+        return super().get_queryset(request).select_related('category').with_stock_status()
+
 # --- CATEGORY ADMIN ---
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
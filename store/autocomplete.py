@@ -0,0 +1,227 @@
+"""
+Search-as-you-type suggestions served from memory.
+
+Every suggestion (product title, variant SKU, category, collection) is
+indexed under each word-suffix of its label ("navy polo tshirt",
+"polo tshirt", "tshirt") in one sorted array, so a prefix lookup is a
+bisect plus a scan of the matching range, ranked by popularity. Ranked
+results for one- and two-character prefixes, whose ranges are the widest,
+are memoized and dropped only when an entry under that prefix changes. No
+database access happens per keystroke.
+
+Like store.fuzzy, the index is built on first use, patched from the
+shared change log (store.change_log) and reloaded by `manage.py
+rebuild_catalog_indexes`; each worker process holds its own copy.
+"""
+import bisect
+import heapq
+import threading
+from collections import defaultdict, namedtuple
+
+from django.db.models import Count, Q
+
+from . import change_log, index_stamp, search
+
+# kind: 'product' | 'sku' | 'category' | 'collection'; gender: None means "any"
+Suggestion = namedtuple('Suggestion', 'kind label slug gender popularity')
+
+MEMO_PREFIX_LENGTH = 2  # Results for prefixes this short are memoized until an entry under them changes
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+
+def normalize(text):
+    return ' '.join(search.tokenize(text))
+
+
+def index_keys(kind, label):
+    if kind == 'sku':
+        return [normalize(label)]  # "101-BLK-XL" -> "101 blk xl", matched from the start only
+    words = normalize(label).split()
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.keys = []          # sorted [(key, entry_key)]
+        self.entries = {}       # entry_key -> Suggestion
+        self.memo = {}          # prefix -> {gender: ranked suggestions}, short prefixes only
+
+    def update(self, entry_key, suggestion):
+        """Insert, replace or (with suggestion=None) remove one entry."""
+        with self.lock:
+            old = self.entries.pop(entry_key, None)
+            if old is not None:
+                self._forget(old)
+                for key in index_keys(old.kind, old.label):
+                    pos = bisect.bisect_left(self.keys, (key, entry_key))
+                    if pos < len(self.keys) and self.keys[pos] == (key, entry_key):
+                        del self.keys[pos]
+            if suggestion is not None:
+                self._forget(suggestion)
+                self.entries[entry_key] = suggestion
+                for key in index_keys(suggestion.kind, suggestion.label):
+                    bisect.insort(self.keys, (key, entry_key))
+
+    def _forget(self, suggestion):
+        """Drop memoized results that `suggestion` is (or may now be) ranked in."""
+        for key in index_keys(suggestion.kind, suggestion.label):
+            for length in range(1, MEMO_PREFIX_LENGTH + 1):
+                self.memo.pop(key[:length], None)
+
+    def load(self, items):
+        """Bulk load (entry_key, Suggestion) pairs; one sort instead of N inserts."""
+        with self.lock:
+            self.clear()
+            for entry_key, suggestion in items:
+                self.entries[entry_key] = suggestion
+                self.keys.extend((key, entry_key) for key in index_keys(suggestion.kind, suggestion.label))
+            self.keys.sort()
+            self.memo.clear()
+
+    def lookup(self, query, gender=None, limit=DEFAULT_LIMIT):
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        gender = gender.capitalize() if gender else None
+        with self.lock:
+            ranked = self.memo.get(prefix, {}).get(gender)
+            if ranked is None:
+                ranked = self._scan(prefix, gender)
+                if len(prefix) <= MEMO_PREFIX_LENGTH:
+                    if len(self.memo) >= 4096:
+                        self.memo.clear()  # Arbitrary two-character queries could otherwise grow it
+                    self.memo.setdefault(prefix, {})[gender] = ranked
+        return ranked[:limit]
+
+    def _scan(self, prefix, gender):
+        keys, entries = self.keys, self.entries
+        start = bisect.bisect_left(keys, (prefix,))
+        end = bisect.bisect_left(keys, (prefix + '\U0010ffff',), start)
+        candidates = (entries[entry_key] for entry_key in {entry_key for _, entry_key in keys[start:end]})
+        if gender:
+            candidates = (s for s in candidates if s.gender in (None, 'All', gender))
+        return heapq.nsmallest(MAX_LIMIT, candidates, key=lambda s: (-s.popularity, s.label))
+
+    def stats(self):
+        with self.lock:
+            return {'entries': len(self.entries), 'keys': len(self.keys)}
+
+
+# --- Entries from the database ---
+def product_suggestions(products, skus_by_product=None):
+    """
+    Entries for the given products and their variants' SKUs, ranked by
+    review count. SKU entry keys are also added to `skus_by_product`
+    ({product id: set}) when given.
+    """
+    from .models import ProductVariant
+    rows = products.annotate(popularity=Count('reviews')).values_list('pk', 'title', 'slug', 'gender', 'popularity')
+    owners = {}
+    for pk, title, slug, gender, popularity in rows.iterator(chunk_size=5000):
+        owners[pk] = (slug, gender, popularity)
+        yield ('product', pk), Suggestion('product', title, slug, gender, popularity)
+    skus = ProductVariant.objects.filter(product__in=products.values('pk')).values_list('pk', 'sku', 'product_id')
+    for pk, sku, product_id in skus.iterator(chunk_size=5000):
+        if product_id in owners:
+            if skus_by_product is not None:
+                skus_by_product[product_id].add(('sku', pk))
+            yield ('sku', pk), Suggestion('sku', sku, *owners[product_id])
+
+
+def group_suggestions(kind, queryset):
+    """Entries for categories or collections, ranked by their number of active products."""
+    label_field = 'name' if kind == 'category' else 'title'
+    queryset = queryset.annotate(popularity=Count('products', filter=Q(products__is_active=True)))
+    for group in queryset:
+        yield (kind, group.pk), Suggestion(kind, getattr(group, label_field), group.slug, group.gender, group.popularity)
+
+
+def groups(kind):
+    """The categories or collections the index covers (inactive collections are left out)."""
+    from .models import Category, Collection
+    return Category.objects.all() if kind == 'category' else Collection.objects.filter(is_active=True)
+
+
+def all_suggestions(skus_by_product=None):
+    from .models import Product
+    yield from product_suggestions(Product.objects.filter(is_active=True), skus_by_product)
+    yield from group_suggestions('category', groups('category'))
+    yield from group_suggestions('collection', groups('collection'))
+
+
+# --- Process-wide index ---
+_index = PrefixIndex()
+_loaded = False
+_stamp = None
+_sequence = 0  # Last change log entry this process has applied
+_skus = defaultdict(set)  # product id -> its SKU entry keys, to drop SKUs deleted since
+_load_lock = threading.Lock()
+
+
+def _build():
+    global _loaded, _stamp, _sequence
+    _stamp = index_stamp.current()
+    _sequence = change_log.latest()  # Changes logged while loading are replayed after; replaying is idempotent
+    _skus.clear()
+    _index.load(all_suggestions(_skus))
+    _loaded = True
+
+
+def _catch_up():
+    """Re-read the rows named by change log entries logged since this process last looked."""
+    global _sequence
+    latest, changes = change_log.since(_sequence)
+    if changes is None or ('all', None) in changes:
+        _build()
+        return
+    changed = defaultdict(set)
+    for kind, pk in changes:
+        changed[kind].add(pk)
+    if changed['product']:
+        _load_products(changed['product'])
+    for kind in ('category', 'collection'):
+        if changed[kind]:
+            _load_groups(kind, changed[kind])
+    _sequence = latest
+
+
+def _load_products(product_ids):
+    """Re-read products and their SKUs; deleted or inactive ones drop out."""
+    from .models import Product
+    for product_id in product_ids:
+        _index.update(('product', product_id), None)
+        for entry_key in _skus.pop(product_id, ()):
+            _index.update(entry_key, None)
+    for entry_key, suggestion in product_suggestions(Product.objects.filter(pk__in=product_ids, is_active=True), _skus):
+        _index.update(entry_key, suggestion)
+
+
+def _load_groups(kind, pks):
+    for pk in pks:
+        _index.update((kind, pk), None)
+    for entry_key, suggestion in group_suggestions(kind, groups(kind).filter(pk__in=pks)):
+        _index.update(entry_key, suggestion)
+
+
+def rebuild():
+    with _load_lock:
+        _build()
+    return _index
+
+
+def get_index():
+    with _load_lock:
+        if not _loaded or _stamp != index_stamp.current():
+            _build()
+        else:
+            _catch_up()
+    return _index
+
+
+def lookup(query, gender=None, limit=DEFAULT_LIMIT):
+    return get_index().lookup(query, gender=gender, limit=limit)
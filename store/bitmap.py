@@ -0,0 +1,293 @@
+"""
+In-memory bitmap index for the catalog filters.
+
+Every active product gets a dense ordinal, and every filterable attribute
+value owns a bitmap (a Python int) with one bit per ordinal:
+
+    ('gender', 'men'), ('category', id), ('collection', id), ('badge', 'NEW'),
+    ('color', id), ('size', id), ('variant', (color_id, size_id))
+
+Color, size and variant bitmaps only count in-stock variants, matching the
+`color` / `size` filters of ProductFilterMixin. A filter combination is
+answered with & and | on those ints, and the caller fetches just the page
+of ids it needs.
+
+Every product (active or not) gets an ordinal, in id order, and keeps it
+until the next rebuild; only active products are in the ('all', None)
+bitmap. Iterating bits in ordinal order therefore yields ascending ids.
+Products created later are appended; one whose create commits after a
+higher id's is not, and rebuilds the index instead.
+
+Each worker process holds its own copy, kept current by replaying the
+shared change log (store.change_log) on lookup and rebuilt when
+rebuild_catalog_indexes runs (see store.index_stamp).
+"""
+import bisect
+import threading
+from collections import defaultdict
+
+from . import change_log, index_stamp
+
+# Query params this index can answer; anything else goes through the ORM
+SUPPORTED_PARAMS = {'gender', 'category', 'collection', 'badge', 'color', 'size'}
+# Change log kinds that only touch the name lookups
+NAME_KINDS = {'category', 'collection', 'color', 'size'}
+
+
+def split_param(value):
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+def iter_bits(bits, start=0):
+    """Positions of the set bits of `bits`, ascending, from `start` on."""
+    bits >>= start
+    position = start
+    while bits:
+        low = bits & -bits
+        shift = low.bit_length() - 1
+        position += shift
+        yield position
+        bits >>= shift + 1
+        position += 1
+
+
+def product_keys(is_active, gender, category_id, badge):
+    if not is_active:
+        return set()
+    keys = {('all', None), ('gender', gender.lower()), ('category', category_id)}
+    if badge:
+        keys.add(('badge', badge))
+    return keys
+
+
+def variant_keys(color_id, size_id):
+    """Keys contributed by one in-stock variant."""
+    return {('color', color_id), ('size', size_id), ('variant', (color_id, size_id))}
+
+
+class BitmapIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.ordinals = {}                  # product id -> ordinal
+        self.product_ids = []               # ordinal -> product id, ascending
+        self.bitmaps = defaultdict(int)     # (attribute, value) -> bitmap
+        self.keys = {}                      # product id -> its bitmap keys
+        # Name lookups so filters resolve without touching the DB
+        self.categories = {}                # id -> lowercase name
+        self.collections = {}               # id -> (slug, lowercase title)
+        self.colors = {}                    # id -> name
+        self.sizes = {}                     # id -> name
+
+    # --- Maintenance ---
+    def set_product(self, product_id, keys):
+        """
+        Replace the bitmap keys of one product; keys=None clears them (deleted
+        product). Returns False, changing nothing, when a product new to the
+        index has a lower id than one already in it: ordinals must stay in id
+        order, so the caller rebuilds.
+        """
+        with self.lock:
+            ordinal = self.ordinals.get(product_id)
+            if ordinal is None:
+                if not keys:
+                    return True  # No bits to set
+                if self.product_ids and product_id < self.product_ids[-1]:
+                    return False  # Its create committed after a later one's
+                ordinal = self.ordinals[product_id] = len(self.product_ids)
+                self.product_ids.append(product_id)
+            mask = ~(1 << ordinal)
+            for key in self.keys.pop(product_id, ()):
+                self.bitmaps[key] &= mask
+            if keys:
+                bit = 1 << ordinal
+                for key in keys:
+                    self.bitmaps[key] |= bit
+                self.keys[product_id] = frozenset(keys)
+            return True
+
+    def load(self, products, variants, memberships, categories, collections, colors, sizes):
+        """Bulk build from row iterables (see `build`); products must be in id order."""
+        keys = {}
+        for pk, is_active, gender, category_id, badge in products:
+            keys[pk] = product_keys(is_active, gender, category_id, badge)
+        for product_id, collection_id in memberships:
+            if keys.get(product_id):
+                keys[product_id].add(('collection', collection_id))
+        for product_id, color_id, size_id in variants:
+            if keys.get(product_id):
+                keys[product_id].update(variant_keys(color_id, size_id))
+
+        # Set bits in byte arrays, then convert once per bitmap
+        buffers = defaultdict(lambda: bytearray((len(keys) + 7) // 8))
+        with self.lock:
+            self.clear()
+            for ordinal, (pk, attribute_keys) in enumerate(keys.items()):
+                self.ordinals[pk] = ordinal
+                self.product_ids.append(pk)
+                if attribute_keys:
+                    self.keys[pk] = frozenset(attribute_keys)
+                for key in attribute_keys:
+                    buffers[key][ordinal >> 3] |= 1 << (ordinal & 7)
+            for key, buffer in buffers.items():
+                self.bitmaps[key] = int.from_bytes(buffer, 'little')
+            self.categories = {pk: name.lower() for pk, name in categories}
+            self.collections = {pk: (slug, title.lower()) for pk, slug, title in collections}
+            self.colors = dict(colors)
+            self.sizes = dict(sizes)
+
+    # --- Queries ---
+    def match(self, params):
+        """
+        Bitmap of the active products matching the SUPPORTED_PARAMS in `params`
+        (a QueryDict or dict), with the same semantics as ProductFilterMixin.
+        """
+        with self.lock:
+            bits = self.bitmaps.get(('all', None), 0)
+
+            gender = params.get('gender')
+            if gender:
+                bits &= self.bitmaps.get(('gender', gender.lower()), 0)
+
+            category = (params.get('category') or '').lower()
+            if category:
+                bits &= self.union('category', [pk for pk, name in self.categories.items() if category in name])
+
+            collection = params.get('collection')
+            if collection:
+                title = collection.lower()
+                bits &= self.union('collection', [
+                    pk for pk, (slug, lowered) in self.collections.items() if slug == collection or title in lowered
+                ])
+
+            badge = (params.get('badge') or '').lower()
+            if badge in ('new', 'bestseller'):
+                bits &= self.bitmaps.get(('badge', badge.upper()), 0)
+
+            colors = set(split_param(params.get('color')))
+            sizes = set(split_param(params.get('size')))
+            color_ids = [pk for pk, name in self.colors.items() if name in colors]
+            size_ids = [pk for pk, name in self.sizes.items() if name in sizes]
+            if colors and sizes:
+                bits &= self.union('variant', [(c, s) for c in color_ids for s in size_ids])
+            elif colors:
+                bits &= self.union('color', color_ids)
+            elif sizes:
+                bits &= self.union('size', size_ids)
+            return bits
+
+    def union(self, attribute, values):
+        bits = 0
+        for value in values:
+            bits |= self.bitmaps.get((attribute, value), 0)
+        return bits
+
+    def product_ids_for(self, bits, after_id=None, limit=None):
+        """Product ids of the set bits, ascending, optionally after `after_id` and capped at `limit`."""
+        start = 0 if after_id is None else bisect.bisect_right(self.product_ids, after_id)
+        ids = []
+        for ordinal in iter_bits(bits, start):
+            ids.append(self.product_ids[ordinal])
+            if limit is not None and len(ids) >= limit:
+                break
+        return ids
+
+    def stats(self):
+        with self.lock:
+            return {
+                'products': len(self.ordinals),
+                'ordinals': len(self.product_ids),
+                'bitmaps': len(self.bitmaps),
+                'memory_bytes': sum((bits.bit_length() + 7) // 8 for bits in self.bitmaps.values()),
+            }
+
+
+# --- Process-wide index ---
+_index = BitmapIndex()
+_loaded = False
+_stamp = None
+_sequence = 0  # Last change log entry this process has applied
+_load_lock = threading.Lock()
+
+
+def _build():
+    global _loaded, _stamp, _sequence
+    from .models import Category, Collection, Color, Product, ProductVariant, Size
+    _stamp = index_stamp.current()
+    _sequence = change_log.latest()  # Changes logged while loading are replayed after; replaying is idempotent
+    _index.load(
+        products=Product.objects.order_by('pk').values_list('pk', 'is_active', 'gender', 'category_id', 'badge')
+        .iterator(chunk_size=10000),
+        variants=ProductVariant.objects.filter(stock__gt=0).values_list('product_id', 'color_id', 'size_id')
+        .iterator(chunk_size=10000),
+        memberships=Product.collections.through.objects.values_list('product_id', 'collection_id')
+        .iterator(chunk_size=10000),
+        categories=Category.objects.values_list('pk', 'name'),
+        collections=Collection.objects.values_list('pk', 'slug', 'title'),
+        colors=Color.objects.values_list('pk', 'name'),
+        sizes=Size.objects.values_list('pk', 'name'),
+    )
+    _loaded = True
+
+
+def _catch_up():
+    """Apply the change log entries logged since this process last looked."""
+    global _sequence
+    latest, changes = change_log.since(_sequence)
+    if changes is None or ('all', None) in changes:
+        _build()
+        return
+    names_changed = False
+    for kind, pk in changes:
+        if kind == 'product' and not _load_product(pk):
+            _build()  # Out of id order; see BitmapIndex.set_product
+            return
+        elif kind in NAME_KINDS:
+            names_changed = True
+    if names_changed:
+        _load_names()
+    _sequence = latest
+
+
+def rebuild():
+    with _load_lock:
+        _build()
+    return _index
+
+
+def get_index():
+    with _load_lock:
+        if not _loaded or _stamp != index_stamp.current():
+            _build()
+        else:
+            _catch_up()
+    return _index
+
+
+def _load_product(product_id):
+    """Re-read one product's keys (a deleted product is cleared); False when the index must rebuild."""
+    from .models import Product, ProductVariant
+    row = Product.objects.filter(pk=product_id).values_list('is_active', 'gender', 'category_id', 'badge').first()
+    if row is None:
+        return _index.set_product(product_id, None)
+    keys = product_keys(*row)
+    if keys:
+        keys.update(('collection', pk) for pk in
+                    Product.collections.through.objects.filter(product_id=product_id).values_list('collection_id', flat=True))
+        for color_id, size_id in (ProductVariant.objects.filter(product_id=product_id, stock__gt=0)
+                                  .values_list('color_id', 'size_id')):
+            keys.update(variant_keys(color_id, size_id))
+    return _index.set_product(product_id, keys)
+
+
+def _load_names():
+    from .models import Category, Collection, Color, Size
+    with _index.lock:
+        _index.categories = {pk: name.lower() for pk, name in Category.objects.values_list('pk', 'name')}
+        _index.collections = {
+            pk: (slug, title.lower()) for pk, slug, title in Collection.objects.values_list('pk', 'slug', 'title')
+        }
+        _index.colors = dict(Color.objects.values_list('pk', 'name'))
+        _index.sizes = dict(Size.objects.values_list('pk', 'name'))
@@ -0,0 +1,332 @@
+"""
+Bulk catalog import from CSV or JSON Lines (see `manage.py import_catalog`).
+
+One row per variant; product columns repeat on each of a product's rows
+and the first row seen for a product wins:
+
+    title, slug, description, gender, category, collections, price,
+    original_price, fabric, fit, features, care_instructions, badge,
+    is_active, color, hex, size, sort_order, sku, stock, price_override,
+    images
+
+`collections` and `images` hold several values separated by `|` (JSON
+lines may use lists); images are storage paths under MEDIA_ROOT and are
+linked to the row's color. Products are matched by slug (slugified title
+when missing) and variants by SKU, falling back to product/color/size; a
+match is updated in place, anything else is created. Missing categories,
+collections, colors and sizes are created by name.
+
+Rows are streamed and written in chunks, each in its own transaction, with
+bulk_create / bulk_update and name -> id maps instead of per-row saves.
+Bulk writes skip model signals, so `finish()` brings the search index,
+product documents, response cache and in-memory indexes up to date once
+the rows are in.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import documents, index_stamp, response_cache, search
+from .models import Category, Collection, Color, Product, ProductImage, ProductVariant, Size
+
+PRODUCT_FIELDS = [
+    'title', 'description', 'gender', 'category_id', 'price', 'original_price',
+    'fabric', 'fit', 'features', 'care_instructions', 'badge', 'is_active', 'updated_at',
+]
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(stream, fmt):
+    """Yield (line number, dict) from a CSV or JSON Lines stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line_no, line in enumerate(stream, start=1):
+            if line.strip():
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as exc:
+                    yield line_no, RowError(f"invalid JSON: {exc}")
+
+
+def split_values(value):
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [part.strip() for part in str(value or '').split('|') if part.strip()]
+
+
+def text(row, name, default=''):
+    value = row.get(name)
+    return str(value).strip() or default if value is not None else default
+
+
+def decimal(row, name, required=False):
+    value = text(row, name)
+    if not value:
+        if required:
+            raise RowError(f"missing {name}")
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise RowError(f"bad {name}: {value!r}")
+
+
+def integer(row, name, default=0):
+    value = text(row, name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise RowError(f"bad {name}: {value!r}")
+
+
+def generate_sku(product_id, color_name, size_name):
+    """Same scheme as ProductVariant.save()."""
+    return f"{product_id}-{color_name[:3].upper()}-{size_name}".upper()
+
+
+class NameMap:
+    """name -> id for a lookup model, loaded once and extended as rows create new names."""
+
+    def __init__(self, model, field, defaults=None):
+        self.model, self.field, self.defaults = model, field, defaults or {}
+        self.ids = {
+            name.lower(): pk for pk, name in model.objects.order_by('-pk').values_list('pk', field)
+        }
+        self.created = 0
+
+    def resolve(self, name, **extra):
+        key = name.lower()
+        if key not in self.ids:
+            obj = self.model(**{self.field: name}, **{**self.defaults, **extra})
+            obj.save()  # Rare, and save() fills slugs
+            self.ids[key] = obj.pk
+            self.created += 1
+        return self.ids[key]
+
+
+class CatalogImporter:
+    def __init__(self, chunk_size=2000, progress=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.categories = NameMap(Category, 'name')
+        self.collections = NameMap(Collection, 'title')
+        self.colors = NameMap(Color, 'name', {'hex_code': '#000000'})
+        self.sizes = NameMap(Size, 'name')
+        self.counts = dict.fromkeys(
+            ('rows', 'products_created', 'products_updated', 'variants_created', 'variants_updated', 'images'), 0
+        )
+        self.errors = []
+        self.products = {}  # slug -> id of every product this import has written
+
+    # --- Streaming ---
+    def run(self, rows):
+        chunk = []
+        for line_no, row in rows:
+            chunk.append((line_no, row))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        return self.counts
+
+    def import_chunk(self, chunk):
+        parsed = []
+        for line_no, row in chunk:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                parsed.append({'line': line_no, **self.parse(row)})
+            except RowError as exc:
+                self.errors.append((line_no, str(exc)))
+        with transaction.atomic():
+            self.write(parsed)
+        self.counts['rows'] += len(chunk)
+        if self.progress:
+            self.progress(self.counts)
+
+    def parse(self, row):
+        title = text(row, 'title')
+        if not title:
+            raise RowError("missing title")
+        color, size = text(row, 'color'), text(row, 'size')
+        if not color or not size:
+            raise RowError("missing color or size")
+        category = text(row, 'category')
+        if not category:
+            raise RowError("missing category")
+        gender = text(row, 'gender', 'Men').title()
+        if gender not in dict(Product.GENDER_CHOICES):
+            raise RowError(f"bad gender: {gender!r}")
+        badge = text(row, 'badge').upper() or None
+        if badge and badge not in dict(Product.BADGE_CHOICES):
+            raise RowError(f"bad badge: {badge!r}")
+        return {
+            'slug': text(row, 'slug') or slugify(title),
+            'product': {
+                'title': title,
+                'description': text(row, 'description'),
+                'gender': gender,
+                'category_id': None,  # Names are resolved by write(), inside the chunk's transaction
+                'price': decimal(row, 'price', required=True),
+                'original_price': decimal(row, 'original_price'),
+                'fabric': text(row, 'fabric'),
+                'fit': text(row, 'fit'),
+                'features': text(row, 'features').replace('\\n', '\n'),
+                'care_instructions': text(row, 'care_instructions').replace('\\n', '\n'),
+                'badge': badge,
+                'is_active': text(row, 'is_active', 'true').lower() in TRUE_VALUES,
+            },
+            'category': category,
+            'collections': split_values(row.get('collections')),
+            'color_name': color,
+            'color_extra': {'hex_code': text(row, 'hex')} if text(row, 'hex') else {},
+            'size_name': size,
+            'sort_order': integer(row, 'sort_order'),
+            'sku': text(row, 'sku'),
+            'stock': integer(row, 'stock'),
+            'price_override': decimal(row, 'price_override'),
+            'images': split_values(row.get('images')),
+        }
+
+    # --- Writing ---
+    def write(self, rows):
+        if not rows:
+            return
+        self.resolve_names(rows)
+        products = self.write_products(rows)
+        self.write_variants(rows, products)
+        self.write_images(rows, products)
+        self.write_collections(rows, products)
+
+    def resolve_names(self, rows):
+        """Fill in lookup ids, creating missing categories, collections, colors and sizes."""
+        for row in rows:
+            row['product']['category_id'] = self.categories.resolve(row['category'])
+            row['collection_ids'] = [self.collections.resolve(name) for name in row['collections']]
+            row['color_id'] = self.colors.resolve(row['color_name'], **row['color_extra'])
+            row['size_id'] = self.sizes.resolve(row['size_name'], sort_order=row['sort_order'])
+
+    def write_products(self, rows):
+        """slug -> product id for this chunk's rows, creating or updating one product per slug."""
+        wanted = {}
+        for row in rows:
+            if row['slug'] not in self.products:  # Rows of a product split across chunks: first row wins
+                wanted.setdefault(row['slug'], row['product'])
+        existing = dict(Product.objects.filter(slug__in=wanted).values_list('slug', 'pk'))
+
+        now = timezone.now()  # bulk_update doesn't apply auto_now
+        updates = [
+            Product(pk=existing[slug], updated_at=now, **fields) for slug, fields in wanted.items() if slug in existing
+        ]
+        Product.objects.bulk_update(updates, PRODUCT_FIELDS, batch_size=500)
+        created = Product.objects.bulk_create(
+            [Product(slug=slug, **fields) for slug, fields in wanted.items() if slug not in existing],
+            batch_size=500,
+        )
+        existing.update((product.slug, product.pk) for product in created)
+
+        self.counts['products_updated'] += len(updates)
+        self.counts['products_created'] += len(created)
+        self.products.update(existing)
+        return {row['slug']: self.products[row['slug']] for row in rows}
+
+    def write_variants(self, rows, products):
+        for row in rows:
+            row['product_id'] = products[row['slug']]
+            row['sku'] = row['sku'] or generate_sku(row['product_id'], row['color_name'], row['size_name'])
+        # Match by (product, color, size) first, so a row can rename a variant's SKU
+        by_sku = {}
+        by_combo = {}
+        variants = ProductVariant.objects.filter(sku__in=[row['sku'] for row in rows]) | \
+            ProductVariant.objects.filter(product_id__in=set(products.values()))
+        for pk, sku, product_id, color_id, size_id in variants.values_list(
+            'pk', 'sku', 'product_id', 'color_id', 'size_id'
+        ):
+            by_sku[sku] = pk
+            by_combo[(product_id, color_id, size_id)] = pk
+
+        new, updates, seen = [], {}, set()
+        for row in rows:
+            combo = (row['product_id'], row['color_id'], row['size_id'])
+            if combo in seen or row['sku'] in seen:
+                continue  # Repeated inside the chunk: first row wins
+            seen.update((combo, row['sku']))
+            variant = ProductVariant(
+                product_id=row['product_id'], color_id=row['color_id'], size_id=row['size_id'],
+                sku=row['sku'], stock=row['stock'], price_override=row['price_override'],
+            )
+            pk = by_combo.get(combo) or by_sku.get(row['sku'])
+            if pk and by_sku.get(row['sku'], pk) != pk:
+                self.errors.append((row['line'], f"SKU {row['sku']} belongs to another variant"))
+            elif pk:
+                variant.pk = pk
+                updates[pk] = variant
+            else:
+                new.append(variant)
+        ProductVariant.objects.bulk_update(
+            list(updates.values()), ['product', 'color', 'size', 'sku', 'stock', 'price_override'], batch_size=500
+        )
+        ProductVariant.objects.bulk_create(new, batch_size=1000)
+        self.counts['variants_updated'] += len(updates)
+        self.counts['variants_created'] += len(new)
+
+    def write_images(self, rows, products):
+        wanted = {}
+        for row in rows:
+            for path in row['images']:
+                wanted.setdefault((products[row['slug']], path), row['color_id'])
+        if not wanted:
+            return
+        existing = set(
+            ProductImage.objects.filter(product_id__in={product_id for product_id, _ in wanted})
+            .values_list('product_id', 'image')
+        )
+        new = [
+            ProductImage(product_id=product_id, image=path, color_id=color_id)
+            for (product_id, path), color_id in wanted.items() if (product_id, path) not in existing
+        ]
+        ProductImage.objects.bulk_create(new, batch_size=1000)
+        self.counts['images'] += len(new)
+
+    def write_collections(self, rows, products):
+        Through = Product.collections.through
+        Through.objects.bulk_create(
+            list({
+                (products[row['slug']], collection_id): Through(
+                    product_id=products[row['slug']], collection_id=collection_id
+                )
+                for row in rows for collection_id in row['collection_ids']
+            }.values()),
+            batch_size=1000, ignore_conflicts=True,
+        )
+
+    # --- After the import ---
+    def finish(self):
+        """Catch up everything bulk writes bypassed; returns the number of products touched."""
+        product_ids = sorted(self.products.values())
+        for start in range(0, len(product_ids), 1000):
+            batch = product_ids[start:start + 1000]
+            search.index_products(batch)
+            # Stale documents are dropped and re-rendered lazily on the next view
+            documents.ProductDocument.objects.filter(product_id__in=batch).delete()
+            response_cache.bump(*(f'product:{pk}' for pk in batch))
+        response_cache.bump(
+            'catalog', 'categories', 'collections', 'products',
+            *(f'products:gender:{gender}' for gender in response_cache.GENDERS),
+        )
+        index_stamp.touch()  # Workers reload their fuzzy / autocomplete / bitmap indexes
+        return len(product_ids)
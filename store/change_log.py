@@ -0,0 +1,75 @@
+"""
+Shared log of catalog row changes, replayed by the in-memory indexes
+(store.bitmap, store.fuzzy, store.autocomplete).
+
+Each worker process holds its own copy of those indexes. Writes
+(store.signals) don't patch them: once their transaction commits,
+`record()` appends the changed rows to a log in the shared cache (a counter
+plus one key per entry), and every process replays the entries it hasn't
+seen on its next lookup by re-reading those rows, so rolled back writes
+never show and all workers converge. An index that fell too far behind, or
+finds entries evicted, rebuilds instead; so does everyone when
+rebuild_catalog_indexes runs (see store.index_stamp).
+
+Entries are (kind, pk):
+
+    ('product', pk)     a product or anything hanging off it
+                        (variants, stock, collection membership)
+    ('category', pk), ('collection', pk), ('color', pk), ('size', pk)
+    ('all', None)       a change that can't be pinned to rows: rebuild
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+# SEQUENCE_KEY counts entries, CHANGE_PREFIX + n holds the nth
+SEQUENCE_KEY = 'store:changes:sequence'
+CHANGE_PREFIX = 'store:changes:entry:'
+CHANGE_TIMEOUT = 24 * 60 * 60
+MAX_REPLAY = 1000  # Further behind than this, a full rebuild is cheaper than replaying
+
+
+def latest():
+    """Sequence number of the newest entry; an index built now has seen everything up to it."""
+    sequence = cache.get(SEQUENCE_KEY)
+    if sequence is None:
+        # First use, or the counter was evicted: start past any position an index may hold, so
+        # none mistakes the new count for its own and skips entries (the jump makes it rebuild)
+        cache.add(SEQUENCE_KEY, time.time_ns(), None)
+        sequence = cache.get(SEQUENCE_KEY, 0)
+    return sequence
+
+
+def since(sequence):
+    """
+    (latest sequence, entries logged after `sequence`), or (latest, None)
+    when they can't all be replayed and the caller must rebuild.
+    """
+    newest = latest()
+    if newest == sequence:
+        return newest, []
+    if newest < sequence or newest - sequence > MAX_REPLAY:
+        return newest, None  # The counter was restarted, or the caller is far behind
+    keys = [f'{CHANGE_PREFIX}{n}' for n in range(sequence + 1, newest + 1)]
+    found = cache.get_many(keys)
+    if len(found) < len(keys):
+        return newest, None  # Evicted (or not written yet): the log can't tell what changed
+    return newest, [found[key] for key in keys]
+
+
+def _append(changes):
+    try:
+        last = cache.incr(SEQUENCE_KEY, len(changes))
+    except ValueError:
+        latest()
+        last = cache.incr(SEQUENCE_KEY, len(changes))
+    first = last - len(changes) + 1
+    cache.set_many({f'{CHANGE_PREFIX}{first + n}': change for n, change in enumerate(changes)}, CHANGE_TIMEOUT)
+
+
+def record(*changes):
+    """Log `changes` once the current transaction commits (right away outside one)."""
+    changes = list(dict.fromkeys(changes))
+    if changes:
+        transaction.on_commit(lambda: _append(changes))
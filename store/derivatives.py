@@ -0,0 +1,212 @@
+"""
+Resized WebP/JPEG derivatives of uploaded images, for `srcset`.
+
+Every model listed in SOURCES keeps a `derivatives` JSON column describing
+what has been generated for its current file:
+
+    {"source": "products/3f1a...c9.jpg", "width": 2400, "widths": [320, 640, 1024],
+     "rendition": "8c0e51d2"}
+
+Files live next to MEDIA_ROOT's originals under derivatives/, e.g.
+derivatives/products/3f1a...c9-8c0e51d2-320w.webp. The rendition is a hash
+of the rendering settings (widths, formats, quality), so changing them
+writes new files under new names rather than changing the bytes behind a
+URL that is served as immutable (core/storage.py); rows made with other
+settings show up in `pending()` again. Widths at or above the original's
+are skipped (no upscaling). The record names the source file it was made
+from, so replacing an image makes the old record stale without any
+bookkeeping, and serializers simply get no srcset until the new one exists.
+
+store.signals / web_content.signals call `schedule()` on save; the images
+are rendered by store.tasks after commit, never inside the admin request.
+`manage.py generate_image_derivatives` backfills existing media across all
+cores. Once a record is written the cached API responses showing that
+image are invalidated (see `_invalidate`).
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from . import documents, response_cache, tasks
+from .models import Product, ProductImage
+
+logger = logging.getLogger(__name__)
+
+DIRECTORY = 'derivatives'
+WIDTHS = (320, 640, 1024)
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}), 'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})}
+
+RENDER_VERSION = 1  # Bump when render() changes its output, to move every derivative to new names
+ORIENTATION = 0x0112  # EXIF tag
+
+# Model label -> its image field; each has a `derivatives` JSONField
+SOURCES = {
+    'store.ProductImage': 'image',
+    'store.Category': 'image',
+    'store.Collection': 'image',
+    'web_content.HeroSlide': 'image',
+}
+
+
+def widths():
+    return tuple(sorted(getattr(settings, 'STORE_IMAGE_WIDTHS', WIDTHS)))
+
+
+def rendition():
+    """Short hash of everything that decides a derivative's bytes besides its source."""
+    settings_repr = repr((RENDER_VERSION, widths(), sorted(FORMATS.items())))
+    return hashlib.md5(settings_repr.encode()).hexdigest()[:8]
+
+
+def derivative_name(source, width, fmt, rendition=None):
+    """Records written before renditions existed (rendition=None) keep their old names."""
+    stem, _ = os.path.splitext(source)
+    if rendition:
+        stem = f'{stem}-{rendition}'
+    return f'{DIRECTORY}/{stem}-{width}w.{fmt}'
+
+
+def srcset(field_file, derivatives, media_url):
+    """
+    {'webp': 'url 320w, url 640w', 'jpeg': ...} for an image field, or None
+    until derivatives of its current file exist. `media_url(name)` makes a
+    stored file name absolute (core.storage.media_urls).
+    """
+    if not field_file or not derivatives or derivatives.get('source') != field_file.name or not derivatives.get('widths'):
+        return None
+    return {
+        fmt: ', '.join(
+            f"{media_url(derivative_name(field_file.name, width, fmt, derivatives.get('rendition')))} {width}w"
+            for width in derivatives['widths']
+        )
+        for fmt in FORMATS
+    }
+
+
+# --- Rendering (no database access: runs in backfill worker processes too) ---
+def render(source, storage=default_storage, overwrite=False):
+    """
+    Write every derivative of the stored file `source`; returns its `derivatives` record.
+
+    Uploads are content-addressed (core/storage.py) and names carry the
+    rendition, so derivatives that already exist are of the same bytes and
+    are kept unless `overwrite`.
+    """
+    current = rendition()
+    with storage.open(source) as f:
+        image = Image.open(f)
+        original_width, original_height = image.size
+        if image.getexif().get(ORIENTATION) in (5, 6, 7, 8):  # Stored rotated by 90 degrees
+            original_width, original_height = original_height, original_width
+        targets = [width for width in widths() if width < original_width]
+        names = [derivative_name(source, width, fmt, current) for width in targets for fmt in FORMATS]
+        if not overwrite and all(storage.exists(name) for name in names):
+            return {'source': source, 'width': original_width, 'widths': targets, 'rendition': current}
+        if targets:
+            # JPEG decoders can downscale by 2/4/8 while decoding; keep both sides >= the largest width needed
+            image.draft('RGB', (targets[-1], targets[-1]))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    for width in reversed(targets):
+        image = image.resize((width, max(1, round(original_height * width / original_width))), Image.LANCZOS)
+        for fmt, (pil_format, options) in FORMATS.items():
+            out = BytesIO()
+            (image.convert('RGB') if pil_format == 'JPEG' and image.mode != 'RGB' else image).save(out, pil_format, **options)
+            name = derivative_name(source, width, fmt, current)
+            storage.delete(name)  # Same name for the same source, so save() doesn't pick an alternative
+            storage.save(name, ContentFile(out.getvalue()))
+    return {'source': source, 'width': original_width, 'widths': targets, 'rendition': current}
+
+
+def render_safely(source, overwrite=False):
+    """render(), but a missing or unreadable file gives an empty record (logged, not retried on save)."""
+    try:
+        return render(source, overwrite=overwrite)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        logger.warning("Could not make derivatives of %s: %s", source, exc)
+        return {'source': source, 'width': None, 'widths': []}
+
+
+# --- Records ---
+def pending(label, force=False):
+    """(pk, file name) of every row of `label` whose derivatives are missing, stale or of other settings."""
+    model = apps.get_model(label)
+    field = SOURCES[label]
+    current = rendition()
+    rows = model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True}).order_by('pk')
+    return [
+        (pk, name) for pk, name, record in rows.values_list('pk', field, 'derivatives').iterator()
+        if force or (record or {}).get('source') != name or (record or {}).get('rendition') != current
+    ]
+
+
+def renditions_in_use():
+    """
+    {source stem: renditions its records point at} for the orphan sweep
+    (None: a record from before renditions).
+    """
+    used = {}
+    for label in SOURCES:
+        for record in apps.get_model(label).objects.values_list('derivatives', flat=True).iterator():
+            if record and record.get('widths'):
+                used.setdefault(os.path.splitext(record['source'])[0], set()).add(record.get('rendition'))
+    return used
+
+
+def save(label, records):
+    """Store {pk: record} for `label`, skipping rows whose image changed meanwhile; returns rows written."""
+    model = apps.get_model(label)
+    field = SOURCES[label]
+    current = dict(model.objects.filter(pk__in=records).values_list('pk', field))
+    changed = []
+    for pk, record in records.items():
+        if current.get(pk) == record['source']:
+            instance = model(pk=pk)
+            instance.derivatives = record
+            changed.append(instance)
+    # bulk_update skips save(), so this never schedules itself again
+    model.objects.bulk_update(changed, ['derivatives'], batch_size=500)
+    if changed:
+        _invalidate(label, [instance.pk for instance in changed])
+    return len(changed)
+
+
+def _invalidate(label, pks):
+    if label == 'store.ProductImage':
+        product_ids = set(ProductImage.objects.filter(pk__in=pks).values_list('product_id', flat=True))
+        namespaces = set()
+        for pk, gender in Product.objects.filter(pk__in=product_ids).values_list('pk', 'gender'):
+            namespaces.update(response_cache.product_namespaces(pk, gender))
+        response_cache.bump(*namespaces)
+        documents.schedule(product_ids)
+    elif label == 'store.Category':
+        response_cache.bump('categories')
+    elif label == 'store.Collection':
+        response_cache.bump('collections')
+    else:
+        response_cache.bump('content')
+
+
+def generate(label, pk):
+    """Background task: bring one row's derivatives up to date."""
+    model = apps.get_model(label)
+    name = model.objects.filter(pk=pk).values_list(SOURCES[label], flat=True).first()
+    if name:
+        save(label, {pk: render_safely(name)})
+
+
+def schedule(instance):
+    """Queue derivatives for a saved row if its image has none yet (store.signals / web_content.signals)."""
+    name = getattr(instance, SOURCES[instance._meta.label]).name
+    if name and (instance.derivatives or {}).get('source') != name:
+        tasks.defer(generate, instance._meta.label, instance.pk)
@@ -0,0 +1,84 @@
+"""
+Precomputed ProductDetailView responses.
+
+A product changes rarely and is viewed constantly, so its serialized JSON is
+stored in ProductDocument and served as-is. store.signals calls `schedule()`
+whenever a product, its images/variants/reviews or a shared lookup row
+changes; the affected documents are re-rendered in the background by
+store.tasks after the transaction commits. Until then (or if a document was
+never rendered) the view falls back to ProductSerializer.
+
+Image URLs are absolute in the API but the same document is served on every
+host, so documents are rendered with ORIGIN_PLACEHOLDER in place of
+scheme://host and `serve()` substitutes the requesting origin.
+"""
+import json
+import threading
+
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from . import tasks
+from .models import Product, ProductDocument
+from .serializers import ProductSerializer
+
+ORIGIN_PLACEHOLDER = '__store_origin__'
+BATCH_SIZE = 200
+
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+class _OriginPlaceholderRequest:
+    """Just enough of a request for ProductSerializer.get_images."""
+
+    def build_absolute_uri(self, location):
+        return ORIGIN_PLACEHOLDER + location if location.startswith('/') else location
+
+
+def render(product_ids):
+    """Re-render the stored documents for `product_ids`; returns how many were written."""
+    product_ids = list(product_ids)
+    renderer = JSONRenderer()
+    context = {'request': _OriginPlaceholderRequest()}
+    written = 0
+    for start in range(0, len(product_ids), BATCH_SIZE):
+        products = Product.objects.with_listing_data().filter(pk__in=product_ids[start:start + BATCH_SIZE])
+        now = timezone.now()
+        documents = [
+            ProductDocument(
+                product_id=product.pk,
+                body=renderer.render(ProductSerializer(product, context=context).data).decode(),
+                rendered_at=now,
+            )
+            for product in products
+        ]
+        ProductDocument.objects.bulk_create(
+            documents, update_conflicts=True, unique_fields=['product'], update_fields=['body', 'rendered_at'],
+        )
+        written += len(documents)
+    return written
+
+
+def _render_pending():
+    with _pending_lock:
+        product_ids = list(_pending)
+        _pending.clear()
+    if product_ids:
+        render(product_ids)
+
+
+def schedule(product_ids):
+    """Queue documents for re-rendering after commit; repeated ids in one burst render once."""
+    with _pending_lock:
+        _pending.update(product_ids)
+    tasks.defer(_render_pending)
+
+
+def serve(slug, request):
+    """The stored JSON for `slug` as bytes with the request's origin filled in, or None."""
+    body = ProductDocument.objects.filter(product__slug=slug).values_list('body', flat=True).first()
+    if body is None:
+        return None
+    origin = json.dumps(request.build_absolute_uri('/')[:-1])[1:-1]
+    return body.replace(ORIGIN_PLACEHOLDER, origin).encode()
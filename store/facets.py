@@ -0,0 +1,88 @@
+"""
+Facet counts for the product catalog under the current filter set.
+
+Two grouped queries, whatever the number of facet values:
+
+1. product-level facets (category, badge, price bucket), grouped together
+   and split per facet in Python;
+2. one UNION ALL of the relation facets (collection, color, size), each
+   counting distinct products. Color and size only count in-stock variants,
+   matching the `color` / `size` filters.
+"""
+from django.db.models import Case, CharField, Count, F, IntegerField, Value, When
+
+from .models import Product, ProductVariant
+
+# (label, lower bound, upper bound); bounds match the min_price / max_price filters
+PRICE_BUCKETS = (
+    ('0-500', 0, 500),
+    ('500-1000', 500, 1000),
+    ('1000-2000', 1000, 2000),
+    ('2000+', 2000, None),
+)
+
+
+def price_bucket():
+    whens = [When(price__lt=upper, then=Value(label)) for label, _, upper in PRICE_BUCKETS if upper is not None]
+    return Case(*whens, default=Value(PRICE_BUCKETS[-1][0]), output_field=CharField())
+
+
+def grouped(queryset, facet, value, label, position, product_field):
+    """`queryset` grouped into (facet, value, label, position, count) rows."""
+    return (
+        queryset.order_by()
+        .annotate(facet=Value(facet, output_field=CharField()), value=value, label=label, position=position)
+        .values('facet', 'value', 'label', 'position')
+        .annotate(count=Count(product_field, distinct=True))
+        .values_list('facet', 'value', 'label', 'position', 'count')
+    )
+
+
+def compute_facets(products):
+    """Facet counts for `products` (a filtered Product queryset, duplicates allowed)."""
+    product_ids = products.order_by().values('pk')
+    facets = {'category': {}, 'badge': {}, 'price': {}, 'collection': {}, 'color': {}, 'size': {}}
+
+    def add(facet, value, label, position, count):
+        entry = facets[facet].setdefault(value, {'value': value, 'label': label, 'count': 0, '_position': position})
+        entry['count'] += count
+
+    # 1. Category, badge and price bucket in one GROUP BY
+    rows = (
+        Product.objects.filter(pk__in=product_ids).order_by()
+        .values('category__name', 'badge', bucket=price_bucket())
+        .annotate(count=Count('pk'))
+    )
+    for row in rows:
+        add('category', row['category__name'], row['category__name'], 0, row['count'])
+        if row['badge']:
+            add('badge', row['badge'], row['badge'], 0, row['count'])
+        add('price', row['bucket'], row['bucket'], 0, row['count'])
+
+    # 2. Collections, colors and sizes in one UNION ALL
+    memberships = Product.collections.through.objects.filter(product_id__in=product_ids)
+    in_stock = ProductVariant.objects.filter(product_id__in=product_ids, stock__gt=0)
+    zero = Value(0, output_field=IntegerField())
+    union = grouped(memberships, 'collection', F('collection__slug'), F('collection__title'), zero, 'product_id').union(
+        grouped(in_stock, 'color', F('color__name'), F('color__name'), zero, 'product_id'),
+        grouped(in_stock, 'size', F('size__name'), F('size__name'), F('size__sort_order'), 'product_id'),
+        all=True,
+    )
+    for facet, value, label, position, count in union:
+        add(facet, value, label, position, count)
+
+    # Sizes keep their catalog order, everything else is by count
+    result = {}
+    for facet, values in facets.items():
+        if facet == 'size':
+            key = lambda e: (e['_position'], e['value'])
+        elif facet == 'price':
+            order = [label for label, _, _ in PRICE_BUCKETS]
+            key = lambda e: order.index(e['value'])
+        else:
+            key = lambda e: (-e['count'], e['value'])
+        result[facet] = [
+            {k: v for k, v in entry.items() if k != '_position'}
+            for entry in sorted(values.values(), key=key)
+        ]
+    return result
@@ -0,0 +1,100 @@
+"""
+Product feeds for ad platforms (Google Merchant Center, Meta catalogs).
+
+One item per active ProductVariant, grouped under its product
+(item_group_id), with the variant's price (base + price_override), stock,
+color/size and the image linked to its color. Products are read with
+`.iterator(chunk_size=...)` and every item is encoded as soon as it's built,
+so a feed of any size is produced in constant memory; the view streams it
+with StreamingHttpResponse and `manage.py export_product_feed` writes it to
+a file.
+"""
+import csv
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from .models import Product, ProductVariant
+from .sitemaps import frontend_url
+
+CHUNK_SIZE = 500
+DESCRIPTION_LIMIT = 5000  # Google's maximum
+FIELDS = [
+    'id', 'item_group_id', 'title', 'description', 'link', 'image_link', 'availability', 'price',
+    'quantity', 'color', 'size', 'gender', 'product_type', 'condition',
+]
+GENDERS = {'Men': 'male', 'Women': 'female'}
+
+
+def items(media_url, chunk_size=CHUNK_SIZE):
+    """
+    Yield one dict (keys: FIELDS) per variant of every active product.
+
+    `media_url(name)` turns a stored file name into its public URL
+    (core.storage.MediaURLs).
+    """
+    currency = getattr(settings, 'STORE_FEED_CURRENCY', 'INR')
+    products = (
+        Product.objects.filter(is_active=True).order_by('pk')
+        .select_related('category')
+        .only('pk', 'title', 'slug', 'description', 'gender', 'price', 'category__name')
+        .prefetch_related(
+            Prefetch('variants', queryset=ProductVariant.objects.select_related('color', 'size').order_by('pk')),
+            'images',
+        )
+    )
+    for product in products.iterator(chunk_size=chunk_size):
+        images = list(product.images.all())
+        description = product.description[:DESCRIPTION_LIMIT]
+        for variant in product.variants.all():
+            image = next((i for i in images if i.color_id == variant.color_id), images[0] if images else None)
+            yield {
+                'id': variant.sku,
+                'item_group_id': product.pk,
+                'title': f"{product.title} - {variant.color.name} / {variant.size.name}",
+                'description': description,
+                'link': frontend_url('product', product.slug),
+                'image_link': media_url(image.image.name) if image else '',
+                'availability': 'in_stock' if variant.stock > 0 else 'out_of_stock',
+                'price': f"{product.price + (variant.price_override or 0):.2f} {currency}",
+                'quantity': variant.stock,
+                'color': variant.color.name,
+                'size': variant.size.name,
+                'gender': GENDERS.get(product.gender, 'unisex'),
+                'product_type': product.category.name,
+                'condition': 'new',
+            }
+
+
+class _Line:
+    """A csv.writer target that hands back each written row instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_feed(feed_items):
+    """Yield the feed as CSV text, one line per item."""
+    writer = csv.writer(_Line())
+    yield writer.writerow(FIELDS)
+    for item in feed_items:
+        yield writer.writerow([item[field] for field in FIELDS])
+
+
+def xml_feed(feed_items):
+    """Yield the feed as RSS 2.0 with the Google `g:` namespace, one <item> at a time."""
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n<channel>\n'
+        f'<title>Products</title>\n<link>{escape(settings.FRONTEND_URL)}</link>\n'
+    )
+    for item in feed_items:
+        yield '<item>' + ''.join(f'<g:{field}>{escape(str(item[field]))}</g:{field}>' for field in FIELDS) + '</item>\n'
+    yield '</channel>\n</rss>\n'
+
+
+FORMATS = {
+    'csv': (csv_feed, 'text/csv; charset=utf-8'),
+    'xml': (xml_feed, 'application/xml; charset=utf-8'),
+}
@@ -0,0 +1,148 @@
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, Q
+
+from . import bitmap, fuzzy
+from . import search as product_search
+from .models import ProductVariant
+
+
+def split_param(value):
+    """'Navy, Black' -> ['Navy', 'Black']"""
+    return [part.strip() for part in (value or '').split(',') if part.strip()]
+
+
+def parse_price(value):
+    try:
+        return Decimal(value) if value else None
+    except InvalidOperation:
+        return None
+
+
+class ProductFilterMixin:
+    """
+    Query-string filters shared by the product endpoints (listing, facets):
+    gender, category, collection, badge, color, size, min_price, max_price
+    and search. Sets `self.did_you_mean` when search fell back to a correction,
+    and `self.search_ranking` (matching ids, best first) when the full-text
+    index answered the search; the rows themselves are left unordered.
+
+    With a full-text index, `search` matches products containing every word
+    of it as a word prefix ("pol tsh" finds "Polo Tshirt"), not as an
+    arbitrary substring ("olo" no longer finds "Polo"); see store/search.py.
+    """
+    FILTER_PARAMS = ('gender', 'category', 'collection', 'badge', 'color', 'size', 'min_price', 'max_price', 'search')
+
+    # Searches with fewer hits than this also try the "did you mean" correction
+    FUZZY_MIN_HITS = 3
+
+    # Bitmap matches larger than this (outside a keyset page) use the ORM joins instead
+    BITMAP_MAX_IDS = 5000
+
+    def filter_products(self, queryset):
+        self.search_ranking = None
+        filtered = self.bitmap_filter(queryset)
+        if filtered is not None:
+            self.did_you_mean = None
+            return filtered
+
+        params = self.request.query_params
+
+        gender = params.get('gender')
+        if gender:
+            queryset = queryset.filter(gender__iexact=gender)
+
+        category = params.get('category')
+        if category:
+            queryset = queryset.filter(category__name__icontains=category)
+
+        collection = params.get('collection')
+        if collection:
+            queryset = queryset.filter(Q(collections__slug=collection) | Q(collections__title__icontains=collection))
+
+        badge = params.get('badge')
+        if badge:
+            if badge.lower() == 'new': queryset = queryset.filter(badge='NEW')
+            elif badge.lower() == 'bestseller': queryset = queryset.filter(badge='BESTSELLER')
+
+        # Color / size: at least one in-stock variant matching both (comma = any of)
+        colors, sizes = split_param(params.get('color')), split_param(params.get('size'))
+        if colors or sizes:
+            variants = ProductVariant.objects.filter(product=OuterRef('pk'), stock__gt=0)
+            if colors:
+                variants = variants.filter(color__name__in=colors)
+            if sizes:
+                variants = variants.filter(size__name__in=sizes)
+            queryset = queryset.filter(Exists(variants))
+
+        min_price, max_price = parse_price(params.get('min_price')), parse_price(params.get('max_price'))
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lt=max_price)
+
+        search = params.get('search')
+        self.did_you_mean = None
+        if search:
+            queryset = self.search_queryset(queryset, search)
+
+        return queryset
+
+    def bitmap_filter(self, queryset):
+        """
+        Answer the filters from the in-memory bitmaps (store/bitmap.py) and
+        restrict `queryset` to the matching ids, or return None to use the ORM.
+        """
+        params = self.request.query_params
+        if not getattr(settings, 'STORE_BITMAP_INDEX', False):
+            return None
+        if not any(params.get(key) for key in bitmap.SUPPORTED_PARAMS):
+            return None
+        if any(params.get(key) for key in self.FILTER_PARAMS if key not in bitmap.SUPPORTED_PARAMS):
+            return None
+
+        index = bitmap.get_index()
+        bits = index.match(params)
+        bounds = self.bitmap_page_bounds()
+        if bounds is not None:
+            after_id, limit = bounds
+            return queryset.filter(pk__in=index.product_ids_for(bits, after_id=after_id, limit=limit))
+        if bits.bit_count() > self.BITMAP_MAX_IDS:
+            return None
+        return queryset.filter(pk__in=index.product_ids_for(bits))
+
+    def bitmap_page_bounds(self):
+        """(after_id, limit) when the caller only needs one keyset page in id order."""
+        return None
+
+    def search_queryset(self, queryset, search):
+        # Full-text index over title, description, category and SKUs (store/search.py)
+        ranked_ids = product_search.ranked_product_ids(search)
+        if ranked_ids is None:
+            # No full-text index on this database: scan title/description/SKUs
+            def matches(term):
+                return (
+                    Q(title__icontains=term) | 
+                    Q(description__icontains=term) |
+                    Q(variants__sku__icontains=term)
+                )
+
+            condition = matches(search)
+            if queryset.filter(condition)[:self.FUZZY_MIN_HITS].count() < self.FUZZY_MIN_HITS:
+                self.did_you_mean = fuzzy.suggest(search)
+                if self.did_you_mean:
+                    condition |= matches(self.did_you_mean)
+            return queryset.filter(condition).distinct() # Distinct is important because joining variants can duplicate rows
+
+        if len(ranked_ids) < self.FUZZY_MIN_HITS:
+            # Typo fallback: exact hits first, then hits for the corrected query
+            self.did_you_mean = fuzzy.suggest(search)
+            if self.did_you_mean:
+                seen = set(ranked_ids)
+                ranked_ids += [pk for pk in product_search.ranked_product_ids(self.did_you_mean) if pk not in seen]
+
+        # Ordered in Python by the caller (see ProductListView): a CASE over every hit would cost
+        # an SQL expression and a few parameters per row
+        self.search_ranking = ranked_ids
+        return queryset.filter(id__in=ranked_ids)
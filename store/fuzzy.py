@@ -0,0 +1,217 @@
+"""
+Typo-tolerant spelling suggestions ("did you mean").
+
+An in-process trigram index over the *vocabulary* of product titles,
+category names, collection titles and color names. Indexing words rather
+than whole titles keeps the index small (a catalog of 100k titles shares a
+few thousand distinct words) and lookups well under a millisecond.
+
+The index is built on first use and then patched from the shared change
+log (store.change_log) as the source rows change. Each worker process holds
+its own copy; `manage.py rebuild_catalog_indexes` reloads it everywhere and
+reports its size (see store.index_stamp).
+"""
+import sys
+import threading
+from collections import Counter, defaultdict
+
+from django.apps import apps
+
+from . import change_log, index_stamp, search
+
+MIN_WORD_LENGTH = 3
+MAX_TERMS = 200_000      # Vocabulary cap; words beyond it are not indexed
+MIN_SIMILARITY = 0.3     # Trigram Jaccard similarity, same default as pg_trgm
+MAX_LENGTH_DELTA = 3
+
+# Change log kind -> (model, text field, active rows only)
+SOURCES = {
+    'product': ('Product', 'title', True),
+    'category': ('Category', 'name', False),
+    'collection': ('Collection', 'title', True),
+    'color': ('Color', 'name', False),
+}
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def indexable_words(text):
+    return {w for w in search.tokenize(text) if len(w) >= MIN_WORD_LENGTH and not w.isdigit()}
+
+
+class TrigramIndex:
+    def __init__(self, max_terms=MAX_TERMS):
+        self.max_terms = max_terms
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.documents = {}                   # (source, pk) -> frozenset of words
+        self.frequency = Counter()            # word -> number of documents containing it
+        self.gram_counts = {}                 # word -> number of distinct trigrams
+        self.postings = defaultdict(set)      # trigram -> words
+        self.dropped = 0                      # words not indexed because of max_terms
+
+    # --- Maintenance ---
+    def update(self, key, text):
+        """Index (or re-index) the document `key`; an empty text removes it."""
+        words = frozenset(indexable_words(text))
+        with self.lock:
+            old = self.documents.pop(key, frozenset())
+            for word in old - words:
+                self._release(word)
+            for word in words - old:
+                self._acquire(word)
+            if words:
+                self.documents[key] = words
+
+    def remove(self, key):
+        self.update(key, '')
+
+    def _acquire(self, word):
+        if word not in self.frequency:
+            if len(self.frequency) >= self.max_terms:
+                self.dropped += 1
+                return
+            grams = trigrams(word)
+            for gram in grams:
+                self.postings[gram].add(word)
+            self.gram_counts[word] = len(grams)
+        self.frequency[word] += 1
+
+    def _release(self, word):
+        if word not in self.frequency:
+            return
+        self.frequency[word] -= 1
+        if self.frequency[word] <= 0:
+            del self.frequency[word]
+            del self.gram_counts[word]
+            for gram in trigrams(word):
+                bucket = self.postings.get(gram)
+                if bucket is not None:
+                    bucket.discard(word)
+                    if not bucket:
+                        del self.postings[gram]
+
+    # --- Lookups ---
+    def closest(self, word):
+        """Best vocabulary match for `word` (the word itself when known), or None."""
+        if word in self.frequency:
+            return word
+        grams = trigrams(word)
+        with self.lock:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.postings.get(gram, ()))
+            best, best_key = None, None
+            for candidate, common in shared.items():
+                if abs(len(candidate) - len(word)) > MAX_LENGTH_DELTA:
+                    continue
+                score = common / (len(grams) + self.gram_counts[candidate] - common)
+                key = (score, self.frequency[candidate])
+                if score >= MIN_SIMILARITY and (best_key is None or key > best_key):
+                    best, best_key = candidate, key
+        return best
+
+    def suggest(self, query):
+        """The query with misspelled words corrected, or None when nothing changes."""
+        tokens = search.tokenize(query)
+        corrected = []
+        for token in tokens:
+            if len(token) < MIN_WORD_LENGTH or token.isdigit():
+                corrected.append(token)
+            else:
+                corrected.append(self.closest(token) or token)
+        return ' '.join(corrected) if corrected != tokens else None
+
+    def stats(self):
+        """Sizes plus an estimate of the memory held by the index, in bytes."""
+        with self.lock:
+            size = sum(sys.getsizeof(d) for d in (self.documents, self.frequency, self.gram_counts, self.postings))
+            size += sum(sys.getsizeof(words) for words in self.documents.values())
+            size += sum(sys.getsizeof(word) for word in self.frequency)
+            size += sum(sys.getsizeof(gram) + sys.getsizeof(bucket) for gram, bucket in self.postings.items())
+            return {
+                'documents': len(self.documents),
+                'terms': len(self.frequency),
+                'trigrams': len(self.postings),
+                'dropped_terms': self.dropped,
+                'max_terms': self.max_terms,
+                'memory_bytes': size,
+            }
+
+
+# --- Process-wide index ---
+_index = TrigramIndex()
+_loaded = False
+_stamp = None
+_sequence = 0  # Last change log entry this process has applied
+_load_lock = threading.Lock()
+
+
+def source_rows(kind, pks=None):
+    """(pk, text) of the rows of `kind` the index covers, optionally just `pks`."""
+    model, field, active_only = SOURCES[kind]
+    queryset = apps.get_model('store', model).objects.all()
+    if active_only:
+        queryset = queryset.filter(is_active=True)
+    if pks is not None:
+        queryset = queryset.filter(pk__in=pks)
+    return queryset.values_list('pk', field).iterator(chunk_size=5000)
+
+
+def document_sources():
+    """(key, text) pairs for every document the index covers."""
+    for kind in SOURCES:
+        for pk, text in source_rows(kind):
+            yield (kind, pk), text
+
+
+def _build():
+    global _loaded, _stamp, _sequence
+    _stamp = index_stamp.current()
+    _sequence = change_log.latest()  # Changes logged while loading are replayed after; replaying is idempotent
+    _index.clear()
+    for key, text in document_sources():
+        _index.update(key, text)
+    _loaded = True
+
+
+def _catch_up():
+    """Re-read the rows named by change log entries logged since this process last looked."""
+    global _sequence
+    latest, changes = change_log.since(_sequence)
+    if changes is None or ('all', None) in changes:
+        _build()
+        return
+    changed = defaultdict(set)
+    for kind, pk in changes:
+        if kind in SOURCES:
+            changed[kind].add(pk)
+    for kind, pks in changed.items():
+        texts = dict(source_rows(kind, pks))
+        for pk in pks:
+            _index.update((kind, pk), texts.get(pk, ''))  # Deleted or deactivated rows drop out
+    _sequence = latest
+
+
+def rebuild():
+    with _load_lock:
+        _build()
+    return _index
+
+
+def get_index():
+    with _load_lock:
+        if not _loaded or _stamp != index_stamp.current():
+            _build()
+        else:
+            _catch_up()
+    return _index
+
+
+def suggest(query):
+    return get_index().suggest(query)
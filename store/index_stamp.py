@@ -0,0 +1,35 @@
+"""
+Cross-process "rebuild now" signal for the in-memory catalog indexes
+(store.fuzzy, store.autocomplete, store.bitmap).
+
+Each worker process holds its own copy of those indexes. `manage.py
+rebuild_catalog_indexes` touches settings.STORE_INDEX_STAMP_FILE, and every
+process compares the file's mtime with the one it built from on the next
+lookup (one stat() call), so they all rebuild lazily.
+"""
+import os
+
+from django.conf import settings
+
+
+def path():
+    return getattr(settings, 'STORE_INDEX_STAMP_FILE', None)
+
+
+def current():
+    stamp_file = path()
+    if not stamp_file:
+        return 0
+    try:
+        return os.stat(stamp_file).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def touch():
+    stamp_file = path()
+    if stamp_file:
+        os.makedirs(os.path.dirname(stamp_file), exist_ok=True)
+        with open(stamp_file, 'a'):
+            os.utime(stamp_file, None)
+    return current()
@@ -0,0 +1,126 @@
+"""
+Stock changes for many variants at once, in SQL.
+
+`decrement()` takes stock for a whole order with one conditional UPDATE
+(stock = stock - qty WHERE stock >= qty), so concurrent checkouts can never
+oversell, whatever the database does with select_for_update(), and a 30-line
+order costs the same queries as a 1-line one. If any line is short, nothing
+is taken and OutOfStock names the short variants.
+
+QuerySet.update() sends no signals, so callers then pass the variants they
+changed to `stock_changed()`, which does what store.signals would have done
+for ProductVariant.save(): bump the affected products' response-cache
+versions, re-render their documents and have the filter bitmaps re-read
+products whose variants may have sold out (store.change_log).
+
+`race()` sets concurrent buyers on one SKU, for `manage.py benchmark_catalog
+contention` and store.tests.
+"""
+import multiprocessing
+import time
+
+from django.db import connections, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from . import change_log, documents, response_cache
+from .models import ProductVariant
+
+
+def _per_variant(quantities):
+    return Case(
+        *(When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()),
+        output_field=IntegerField(),
+    )
+
+
+class OutOfStock(Exception):
+    def __init__(self, variant_ids):
+        self.variant_ids = sorted(variant_ids)
+        super().__init__(f"Not enough stock for variants {self.variant_ids}")
+
+
+def decrement(quantities):
+    """
+    Take `quantities` ({variant id: units > 0}) out of stock in one UPDATE, or
+    nothing at all: raises OutOfStock with exactly the variants that were short,
+    and ValueError for a quantity below 1.
+    """
+    if not quantities:
+        return
+    if any(quantity <= 0 for quantity in quantities.values()):
+        raise ValueError(f"Quantities must be positive: {quantities}")  # stock >= -n would add stock
+    with transaction.atomic():
+        updated = ProductVariant.objects.filter(pk__in=quantities, stock__gte=_per_variant(quantities)).update(
+            stock=F('stock') - _per_variant(quantities)
+        )
+        if updated == len(quantities):
+            return
+        transaction.set_rollback(True)  # Put back the lines that did fit
+    # Some line was short: take them one at a time to learn which (stock may also have come back meanwhile)
+    with transaction.atomic():
+        short = [
+            pk for pk, quantity in quantities.items()
+            if not ProductVariant.objects.filter(pk=pk, stock__gte=quantity).update(stock=F('stock') - quantity)
+        ]
+        if not short:
+            return
+        transaction.set_rollback(True)
+    raise OutOfStock(short)
+
+
+def stock_changed(variants, quantities=None):
+    """
+    Catch up caches and indexes after a bulk stock change to `variants`
+    (with `product` loaded, stock as it was before the change). With
+    `quantities` removed, only products that may have sold out refresh their
+    bitmaps; without, all of them do.
+    """
+    namespaces = set()
+    product_ids = set()
+    sold_out = set()
+    for variant in variants:
+        product_ids.add(variant.product_id)
+        namespaces.update(response_cache.product_namespaces(variant.product_id, variant.product.gender))
+        if quantities is None or variant.stock - quantities.get(variant.pk, 0) <= 0:
+            sold_out.add(variant.product_id)
+    if namespaces:
+        response_cache.bump(*namespaces)
+    documents.schedule(product_ids)
+    change_log.record(*(('product', product_id) for product_id in sold_out))
+
+
+# --- Contention check ---
+def _buy(variant_id, start, results):
+    """One buyer of `race()`, in its own process: take one unit of `variant_id`."""
+    try:
+        start.wait(timeout=60)
+        decrement({variant_id: 1})
+        results.put('sold')
+    except OutOfStock:
+        results.put('refused')
+    except Exception as exc:
+        results.put(repr(exc))
+    finally:
+        connections.close_all()
+
+
+def race(variant_id, buyers):
+    """
+    Fork `buyers` processes that each take one unit of `variant_id` at the
+    same moment; returns (outcomes, seconds) with an outcome per buyer:
+    'sold', 'refused' or the repr of an error. Needs fork() and a database
+    the buyers can share (not SQLite in memory).
+    """
+    context = multiprocessing.get_context('fork')
+    start = context.Barrier(buyers)
+    results = context.Queue()
+    processes = [context.Process(target=_buy, args=(variant_id, start, results)) for _ in range(buyers)]
+    connections.close_all()  # Don't hand the open connection to forked buyers
+    for process in processes:
+        process.start()
+    began = time.perf_counter()  # The barrier holds them until the last one is up
+    outcomes = [results.get(timeout=120) for _ in processes]
+    elapsed = time.perf_counter() - began
+    for process in processes:
+        process.join()
+    return outcomes, elapsed
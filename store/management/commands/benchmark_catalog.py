@@ -0,0 +1,307 @@
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+
+from django.db.models import Q
+
+from store import autocomplete, bitmap, fuzzy, inventory, search
+from store.models import Category, Collection, Color, Product, ProductImage, ProductVariant, Size
+from core.storage import media_urls
+from store.serializers import ProductSerializer
+from store.views import AutocompleteView, ProductListView
+
+# Vocabulary for generated titles, so text search has realistic selectivity
+ADJECTIVES = ('Classic', 'Dryfit', 'Oversized', 'Slim', 'Relaxed', 'Ribbed', 'Essential', 'Performance',
+              'Cotton', 'Training', 'Everyday', 'Seamless', 'Vintage', 'Cropped', 'Heavyweight', 'Lightweight')
+NOUNS = ('Polo', 'Crewneck', 'Tshirt', 'Joggers', 'Hoodie', 'Tracks', 'Shorts', 'Tank', 'Sweatshirt',
+         'Jacket', 'Leggings', 'Henley', 'Vest', 'Pullover', 'Trousers', 'Cardigan')
+SYLLABLES = ('ka', 'lo', 'mi', 'ra', 'to', 've', 'sa', 'ni', 'du', 'pe', 'zo', 'ri', 'fa', 'qu', 'bel', 'tan')
+
+
+def style_name(n):
+    """A pronounceable pseudo-word per n (e.g. 'Kalomi'), to give titles a large vocabulary."""
+    parts = []
+    for _ in range(3):
+        n, digit = divmod(n, len(SYLLABLES))
+        parts.append(SYLLABLES[digit])
+    return ''.join(parts).capitalize()
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks catalog code paths against a throwaway test database,
+    so the numbers never touch (or depend on) db.sqlite3.
+
+        python manage.py benchmark_catalog serializer --products 48
+    """
+    help = "Benchmark catalog code paths on a temporary database"
+
+    CASES = ('serializer', 'search', 'fuzzy', 'autocomplete', 'bitmap', 'fields', 'media-urls', 'contention')
+
+    def add_arguments(self, parser):
+        parser.add_argument('case', choices=self.CASES)
+        parser.add_argument('--products', type=int, default=48)
+        parser.add_argument('--colors', type=int, default=10)
+        parser.add_argument('--sizes', type=int, default=8)
+        parser.add_argument('--images', type=int, default=6, help="Images per product (media-urls)")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--buyers', type=int, default=200, help="Concurrent processes (contention)")
+        parser.add_argument('--stock', type=int, default=50, help="Units of the contested SKU (contention)")
+
+    def handle(self, *args, **options):
+        self.options = options
+        old_name = connection.settings_dict['NAME']
+        test_settings = connection.settings_dict['TEST']
+        old_test_name = test_settings.get('NAME')
+        scratch = tempfile.TemporaryDirectory()
+        if connection.vendor == 'sqlite':
+            # In memory, except for contention: buyers are separate processes, which can't share one
+            test_settings['NAME'] = f'{scratch.name}/contention.sqlite3' if options['case'] == 'contention' else None
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            getattr(self, 'bench_%s' % options['case'].replace('-', '_'))()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = old_test_name
+            scratch.cleanup()
+
+    # --- Helpers ---
+    def seed_catalog(self, products, colors, sizes, images=2):
+        """Bulk-insert `products` products with a full colors x sizes variant matrix."""
+        categories = Category.objects.bulk_create(
+            [Category(name=f'{noun} Collection', slug=f'{noun.lower()}-collection') for noun in NOUNS]
+        )
+        color_objs = Color.objects.bulk_create(
+            [Color(name=f'Color {i}', hex_code='#000000') for i in range(colors)]
+        )
+        # Reverse sort_order against insertion order so sorting is actually exercised
+        size_objs = Size.objects.bulk_create(
+            [Size(name=f'S{i}', sort_order=sizes - i) for i in range(sizes)]
+        )
+        collections = Collection.objects.bulk_create(
+            [Collection(title=f'{adjective} Edit', slug=f'{adjective.lower()}-edit') for adjective in ADJECTIVES[:4]]
+        )
+        product_objs = Product.objects.bulk_create([
+            Product(
+                title=self.title_for(i), slug=f'bench-product-{i}',
+                description=f'{ADJECTIVES[i % 7]} fit for gym and travel',
+                gender='Men' if i % 2 else 'Women', category=categories[(i // len(ADJECTIVES)) % len(NOUNS)],
+                price=499 + i % 1500, features='Breathable\nQuick dry', care_instructions='Machine wash',
+                badge=('NEW', 'BESTSELLER', None, None)[i % 4],
+            )
+            for i in range(products)
+        ], batch_size=2000)
+        Product.collections.through.objects.bulk_create([
+            Product.collections.through(product_id=p.pk, collection_id=collections[p.pk % len(collections)].pk)
+            for p in product_objs
+        ], batch_size=5000)
+        for start in range(0, len(product_objs), 500):  # Keep memory flat for large matrices
+            ProductVariant.objects.bulk_create([
+                ProductVariant(product=p, color=c, size=s, sku=f'{p.pk}-{c.pk}-{s.pk}',
+                               stock=(p.pk * 7 + c.pk * 3 + s.pk) % 4)
+                for p in product_objs[start:start + 500] for c in color_objs for s in size_objs
+            ], batch_size=2000)
+        ProductImage.objects.bulk_create([
+            ProductImage(product=p, color=color_objs[i % colors], image=f'products/bench-{p.pk}-{i}.jpg')
+            for p in product_objs for i in range(images)
+        ], batch_size=1000)
+        return product_objs
+
+    @staticmethod
+    def title_for(i):
+        return f'{ADJECTIVES[i % len(ADJECTIVES)]} {NOUNS[(i // len(ADJECTIVES)) % len(NOUNS)]} {style_name(i)}'
+
+    def timed(self, func):
+        """Run `func` --repeat times; return (best seconds, queries of the last run, result)."""
+        best = None
+        for _ in range(self.options['repeat']):
+            reset_queries()  # Seeding can fill the query log, which would hide the count
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                result = func()
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(ctx.captured_queries), result
+
+    def report(self, label, seconds, queries=None, extra=''):
+        queries = '' if queries is None else f"{queries:6d} queries"
+        self.stdout.write(f"{label:<36} {seconds * 1000:9.3f} ms {queries} {extra}".rstrip())
+
+    # --- Cases ---
+    def bench_serializer(self):
+        opts = self.options
+        if opts['products'] < 1:
+            raise CommandError("--products must be at least 1")
+        self.seed_catalog(opts['products'], opts['colors'], opts['sizes'])
+        request = APIRequestFactory().get('/api/store/products/')
+        self.stdout.write(
+            f"{opts['products']} products x {opts['colors']} colors x {opts['sizes']} sizes"
+        )
+
+        def serialize():
+            queryset = Product.objects.filter(is_active=True).with_listing_data()
+            return ProductSerializer(queryset, many=True, context={'request': request}).data
+
+        seconds, queries, data = self.timed(serialize)
+        self.report('listing page', seconds, queries, f"({len(data)} products)")
+        self.report('per product', seconds / len(data))
+
+    def bench_search(self):
+        opts = self.options
+        self.seed_catalog(opts['products'], colors=1, sizes=1, images=0)
+        search.rebuild_index()
+        self.stdout.write(f"{opts['products']} products, full-text backend: {search.backend()}")
+
+        for term in ('dryfit polo', 'joggers', 'performance hoodie kalo'):
+            def icontains():
+                return list(Product.objects.filter(is_active=True).filter(
+                    Q(title__icontains=term) | Q(description__icontains=term) | Q(variants__sku__icontains=term)
+                ).distinct().values_list('id', flat=True))
+
+            seconds, queries, ids = self.timed(icontains)
+            self.report(f'icontains  "{term}"', seconds, queries, f"({len(ids)} hits)")
+            seconds, queries, ids = self.timed(lambda: search.ranked_product_ids(term))
+            self.report(f'full-text  "{term}"', seconds, queries, f"({len(ids)} hits, top {search.RESULT_LIMIT})")
+
+    def bench_fuzzy(self):
+        opts = self.options
+        self.seed_catalog(opts['products'], colors=1, sizes=1, images=0)
+        start = time.perf_counter()
+        index = fuzzy.rebuild()
+        self.report('build index', time.perf_counter() - start)
+        stats = index.stats()
+        self.stdout.write(
+            f"{stats['documents']} documents, {stats['terms']} terms, {stats['trigrams']} trigrams, "
+            f"~{stats['memory_bytes'] / 1024 / 1024:.1f} MiB"
+        )
+        for query in ('polo tshrt', 'jogers', 'hoodei kalomii', 'perfomance trakcs'):
+            rounds = 1000
+            start = time.perf_counter()
+            for _ in range(rounds):
+                suggestion = index.suggest(query)
+            self.report(f'suggest "{query}"', (time.perf_counter() - start) / rounds, extra=f"-> {suggestion!r}")
+
+    def bench_autocomplete(self):
+        opts = self.options
+        self.seed_catalog(opts['products'], colors=2, sizes=2, images=0)
+        start = time.perf_counter()
+        stats = autocomplete.rebuild().stats()
+        self.report('build index', time.perf_counter() - start, extra=f"({stats['entries']} entries, {stats['keys']} keys)")
+
+        # Every prefix of a spread of titles, as typed one keystroke at a time
+        queries = []
+        for i in range(0, opts['products'], max(1, opts['products'] // 200)):
+            title = self.title_for(i).lower()
+            queries += [title[:n] for n in range(1, len(title) + 1)]
+        factory = APIRequestFactory()
+        view = AutocompleteView.as_view()
+        timings = []
+        with CaptureQueriesContext(connection) as ctx:
+            for n, query in enumerate(queries):
+                request = factory.get('/api/store/autocomplete/', {'q': query, 'gender': 'Men' if n % 2 else ''})
+                start = time.perf_counter()
+                view(request).render()
+                timings.append(time.perf_counter() - start)
+        timings.sort()
+        self.stdout.write(f"{len(queries)} keystrokes, {len(ctx.captured_queries)} queries")
+        self.report('p50', timings[len(timings) // 2])
+        self.report('p99', timings[int(len(timings) * 0.99)])
+
+    def bench_bitmap(self):
+        opts = self.options
+        self.seed_catalog(opts['products'], opts['colors'], opts['sizes'], images=0)
+        start = time.perf_counter()
+        stats = bitmap.rebuild().stats()
+        self.report('build index', time.perf_counter() - start,
+                    extra=f"({stats['bitmaps']} bitmaps, ~{stats['memory_bytes'] / 1024:.0f} KiB)")
+        self.stdout.write(f"{opts['products']} products x {opts['colors']} colors x {opts['sizes']} sizes")
+
+        factory = APIRequestFactory()
+        view = ProductListView.as_view()
+        filters = (
+            'gender=Men',
+            'gender=Women&category=polo&badge=new',
+            'collection=classic-edit&color=Color 1,Color 2',
+            'gender=Men&color=Color 3&size=S2',
+            'category=joggers&size=S1,S4&badge=bestseller',
+        )
+        for query in filters:
+            for label, enabled in (('orm', False), ('bitmap', True)):
+                def first_page():
+                    request = factory.get(f'/api/store/products/?{query}&page_size=24')
+                    with override_settings(STORE_BITMAP_INDEX=enabled, STORE_RESPONSE_CACHE={}):
+                        return view(request).render()
+
+                seconds, queries, response = self.timed(first_page)
+                self.report(f'{label:<6} {query}', seconds, queries)
+
+    def bench_fields(self):
+        opts = self.options
+        self.seed_catalog(opts['products'], opts['colors'], opts['sizes'])
+        self.stdout.write(f"{opts['products']} products x {opts['colors']} colors x {opts['sizes']} sizes")
+
+        factory = APIRequestFactory()
+        view = ProductListView.as_view()
+        for label, query in (('full', ''), ('card', '&view=card'), ('fields', '&fields=id,name,price,rating')):
+            def first_page():
+                # Time to the last byte of a rendered page, with the response cache out of the way
+                request = factory.get(f'/api/store/products/?page_size=24{query}')
+                with override_settings(STORE_RESPONSE_CACHE={}):
+                    return view(request).render()
+
+            seconds, queries, response = self.timed(first_page)
+            self.report(f'{label:<6} page of 24', seconds, queries, f"({len(response.content) / 1024:.1f} KiB)")
+
+    def bench_media_urls(self):
+        """python manage.py benchmark_catalog media-urls --products 1000 --images 6 --colors 1 --sizes 1"""
+        opts = self.options
+        self.seed_catalog(opts['products'], opts['colors'], opts['sizes'], images=opts['images'])
+        products = list(Product.objects.filter(is_active=True).with_listing_data())
+        images = [image for product in products for image in product.images.all()]
+        factory = APIRequestFactory()
+        self.stdout.write(f"{len(products)} products x {opts['images']} images")
+
+        def per_image():
+            request = factory.get('/api/store/products/')
+            return [request.build_absolute_uri(image.image.url) for image in images]
+
+        def builder():
+            urls = media_urls(factory.get('/api/store/products/'))
+            return [urls(image.image.name) for image in images]
+
+        seconds, _, old = self.timed(per_image)
+        self.report('build_absolute_uri(image.url)', seconds, extra=f"({len(old)} urls)")
+        seconds, _, new = self.timed(builder)
+        self.report('media_urls(request)(name)', seconds, extra="(same urls)" if new == old else "(URLS DIFFER)")
+
+        for label, base in (('serialize, request host', ''), ('serialize, CDN base', 'https://cdn.example.com/media/')):
+            def serialize():
+                request = factory.get('/api/store/products/')
+                with override_settings(MEDIA_BASE_URL=base):
+                    return ProductSerializer(products, many=True, context={'request': request}).data
+
+            seconds, queries, data = self.timed(serialize)
+            self.report(label, seconds, queries, f"({data[0]['images'][0]['url']})")
+
+    def bench_contention(self):
+        """python manage.py benchmark_catalog contention --buyers 200 --stock 50 (forks; Unix only)"""
+        opts = self.options
+        product = self.seed_catalog(1, colors=1, sizes=1, images=0)[0]
+        variant_id = ProductVariant.objects.filter(product=product).values_list('pk', flat=True).get()
+        ProductVariant.objects.filter(pk=variant_id).update(stock=opts['stock'])
+        self.stdout.write(f"{opts['buyers']} buyers of one unit each, {opts['stock']} in stock")
+
+        outcomes, elapsed = inventory.race(variant_id, opts['buyers'])
+
+        sold, refused = outcomes.count('sold'), outcomes.count('refused')
+        errors = [outcome for outcome in outcomes if outcome not in ('sold', 'refused')]
+        left = ProductVariant.objects.filter(pk=variant_id).values_list('stock', flat=True).get()
+        self.report('conditional UPDATE', elapsed, extra=f"({sold} sold, {refused} refused, {len(errors)} errors, {left} left)")
+        for error in sorted(set(errors)):
+            self.stdout.write(f"  {errors.count(error)} x {error}")
+        if sold > opts['stock'] or sold + left != opts['stock']:
+            raise CommandError(f"Oversold: {sold} units sold from {opts['stock']}, {left} left")
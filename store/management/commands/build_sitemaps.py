@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from store import sitemaps
+
+
+class Command(BaseCommand):
+    help = "Regenerate the sitemap shards under MEDIA_ROOT/sitemaps/ whose products changed"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', required=True, help="Public origin MEDIA_URL is served from, e.g. https://api.example.com")
+        parser.add_argument('--force', action='store_true', help="Rewrite every shard")
+
+    def handle(self, *args, **options):
+        written = sitemaps.build(options['base_url'], force=options['force'])
+        if written:
+            self.stdout.write(self.style.SUCCESS(f"Updated {', '.join(written)} in {sitemaps.directory()}."))
+        else:
+            self.stdout.write("Sitemaps are up to date.")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from store import response_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counts for the catalog response cache (see store/response_cache.py)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them")
+
+    def handle(self, *args, **options):
+        for endpoint, counts in response_cache.stats().items():
+            total = counts['hit'] + counts['miss']
+            ratio = f"{counts['hit'] / total:.1%}" if total else '-'
+            self.stdout.write(f"{endpoint:<12} {counts['hit']:>8} hits {counts['miss']:>8} misses  hit rate {ratio}")
+        if options['reset']:
+            response_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,54 @@
+import os
+import sys
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.storage import MediaURLs
+from store import feeds
+
+
+class Command(BaseCommand):
+    help = "Write the ad-platform product feed (one item per variant) as XML or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(feeds.FORMATS), default='xml')
+        parser.add_argument('--output', help="File to write (replaced atomically); default: stdout")
+        parser.add_argument('--base-url', help="Public origin serving MEDIA_URL, e.g. https://api.example.com "
+                                               "(default: settings.MEDIA_BASE_URL)")
+        parser.add_argument('--chunk-size', type=int, default=feeds.CHUNK_SIZE, help="Products per query")
+
+    def handle(self, *args, **options):
+        if options['base_url']:
+            media_base = urljoin(options['base_url'].rstrip('/') + '/', settings.MEDIA_URL)
+        elif getattr(settings, 'MEDIA_BASE_URL', ''):
+            media_base = settings.MEDIA_BASE_URL
+        else:
+            raise CommandError("Pass --base-url or set MEDIA_BASE_URL; image links must be absolute.")
+        encode, _ = feeds.FORMATS[options['format']]
+        items = feeds.items(MediaURLs(media_base), chunk_size=options['chunk_size'])
+
+        output = options['output']
+        if not output:
+            for chunk in encode(items):
+                sys.stdout.write(chunk)
+            return
+
+        # Write next to the target and swap it in, so a fetch mid-export still sees the previous feed
+        partial = output + '.partial'
+        written = 0
+
+        def counted(items):
+            nonlocal written
+            for item in items:
+                written += 1
+                yield item
+
+        try:
+            with open(partial, 'w', encoding='utf-8', newline='') as f:
+                f.writelines(encode(counted(items)))
+        except OSError as exc:
+            raise CommandError(f"Could not write {output}: {exc}")
+        os.replace(partial, output)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} items to {output}."))
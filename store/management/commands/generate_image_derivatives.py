@@ -0,0 +1,57 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from store import derivatives
+
+
+class Command(BaseCommand):
+    help = "Generate missing or stale resized images (srcset) for existing uploads, in parallel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Processes (default: one per core)")
+        parser.add_argument('--model', action='append', choices=sorted(derivatives.SOURCES),
+                            help="Only this model (repeatable); default: all")
+        parser.add_argument('--force', action='store_true',
+                            help="Re-render images that are already up to date (changed widths or quality are "
+                                 "picked up without it: they change the file names)")
+
+    def handle(self, *args, **options):
+        # Rows that share one upload are rendered once
+        rows = defaultdict(list)
+        for label in options['model'] or derivatives.SOURCES:
+            for pk, name in derivatives.pending(label, force=options['force']):
+                rows[name].append((label, pk))
+        if not rows:
+            self.stdout.write("All image derivatives are up to date.")
+            return
+
+        names = sorted(rows)
+        self.stdout.write(f"Rendering {len(names)} images with {options['workers']} workers...")
+        connections.close_all()  # Don't hand open connections to forked workers
+        written = failed = 0
+        records = defaultdict(dict)
+        render = partial(derivatives.render_safely, overwrite=options['force'])
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=django.setup) as pool:
+            for done, record in enumerate(pool.map(render, names, chunksize=4), start=1):
+                failed += record['width'] is None
+                for label, pk in rows[record['source']]:
+                    records[label][pk] = record
+                if done % 100 == 0 or done == len(names):
+                    for label, batch in records.items():
+                        written += derivatives.save(label, batch)
+                    records.clear()
+                    self.stdout.write(f"  {done}/{len(names)} images", ending='\r')
+                    self.stdout.flush()
+
+        self.stdout.write('')
+        message = f"Updated {written} rows from {len(names)} images."
+        if failed:
+            self.stdout.write(self.style.WARNING(f"{message} {failed} could not be read (see the log)."))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from store.catalog_import import CatalogImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = "Create or update products and variants from a CSV or JSON Lines file (one row per variant)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Default: from the file extension")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows per transaction")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and count, then roll everything back")
+        parser.add_argument('--max-errors', type=int, default=20, help="Bad rows to list (all are skipped)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson', '.json')) else 'csv')
+        if path != '-' and not os.path.exists(path):
+            raise CommandError(f"No such file: {path}")
+
+        started = time.monotonic()
+
+        def progress(counts):
+            rate = counts['rows'] / max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"  {counts['rows']} rows ({rate:.0f}/s)", ending='\r')
+            self.stdout.flush()
+
+        importer = CatalogImporter(chunk_size=options['chunk_size'], progress=progress)
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            # Each chunk commits on its own; a dry run nests them in one transaction that is rolled back
+            with transaction.atomic() if options['dry_run'] else nullcontext():
+                counts = importer.run(read_rows(stream, fmt))
+                if options['dry_run']:
+                    transaction.set_rollback(True)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if not options['dry_run']:
+            importer.finish()
+
+        self.stdout.write('')
+        for line_no, message in importer.errors[:options['max_errors']]:
+            self.stdout.write(self.style.WARNING(f"  line {line_no}: {message}"))
+        if len(importer.errors) > options['max_errors']:
+            self.stdout.write(self.style.WARNING(f"  ... and {len(importer.errors) - options['max_errors']} more"))
+
+        lookups = sum(m.created for m in (importer.categories, importer.collections, importer.colors, importer.sizes))
+        summary = (
+            f"{counts['rows']} rows in {time.monotonic() - started:.1f}s: "
+            f"products {counts['products_created']} created / {counts['products_updated']} updated, "
+            f"variants {counts['variants_created']} created / {counts['variants_updated']} updated, "
+            f"{counts['images']} images, {lookups} new lookups, {len(importer.errors)} skipped"
+        )
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run, nothing saved. {summary}."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {summary}."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from store import autocomplete, bitmap, fuzzy, index_stamp
+
+
+class Command(BaseCommand):
+    help = "Rebuild the in-memory catalog indexes in every worker process and report their size"
+
+    def handle(self, *args, **options):
+        indexes = (
+            ("did-you-mean trigram index", fuzzy),
+            ("autocomplete prefix index", autocomplete),
+            ("filter bitmap index", bitmap),
+        )
+        for label, module in indexes:
+            self.stdout.write(f"{label}:")
+            for key, value in module.rebuild().stats().items():
+                self.stdout.write(f"  {key:<14} {value}")
+
+        # Running processes compare this stamp on their next lookup and reload
+        if index_stamp.touch():
+            self.stdout.write(self.style.SUCCESS(f"Touched {index_stamp.path()}; workers will reload."))
+        else:
+            self.stdout.write(self.style.WARNING("STORE_INDEX_STAMP_FILE is not set; only this process was rebuilt."))
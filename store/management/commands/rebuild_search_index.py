@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from store import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text product search index from scratch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        engine = search.backend()
+        if engine is None:
+            self.stdout.write(self.style.WARNING(
+                "No full-text index on this database (is FTS5 available?); search uses icontains."
+            ))
+            return
+
+        def progress(total):
+            self.stdout.write(f"  indexed {total} products", ending='\r')
+            self.stdout.flush()
+
+        total = search.rebuild_index(batch_size=options['batch_size'], progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} products ({engine})."))
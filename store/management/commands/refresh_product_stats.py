@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the rating and 30-day sales sort columns for every product (run nightly)"
+
+    def handle(self, *args, **options):
+        ratings = stats.refresh_ratings()
+        sales = stats.refresh_sales()
+        self.stdout.write(self.style.SUCCESS(
+            f"Updated rating_avg on {ratings} products and units_sold_30d on {sales} products."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store import stats
+
+
+class Command(BaseCommand):
+    help = "Recount every product's rating counters from its reviews and refresh rating_avg"
+
+    def handle(self, *args, **options):
+        repaired = stats.repair_review_counters()
+        ratings = stats.refresh_ratings()
+        self.stdout.write(self.style.SUCCESS(
+            f"Repaired review counters on {repaired} products; rating_avg changed on {ratings}."
+        ))
@@ -0,0 +1,43 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.core.files.storage import storages
+from django.core.management.base import BaseCommand
+
+from core import storage as upload_storage
+from store import derivatives
+
+
+class Command(BaseCommand):
+    help = "Delete uploaded files (and their resized copies) that no model row references any more"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only list what would be deleted")
+        parser.add_argument('--min-age-hours', type=float, default=24, help="Keep files newer than this (default 24)")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        storage = storages['uploads']
+        renditions = derivatives.renditions_in_use()
+        orphans = upload_storage.orphans(min_age=timedelta(hours=options['min_age_hours']), renditions=renditions)
+        found = freed = 0
+        while True:
+            batch = list(islice(orphans, options['batch_size']))
+            if not batch:
+                break
+            # Rows saved since orphans() read the references may have claimed some of these
+            referenced = upload_storage.still_referenced(batch, renditions)
+            batch = [name for name in batch if name not in referenced]
+            for name in batch:
+                freed += storage.size(name)
+                if options['dry_run']:
+                    self.stdout.write(f"  {name}")
+                else:
+                    storage.delete(name)
+            found += len(batch)
+            if not options['dry_run']:
+                self.stdout.write(f"  deleted {found} files", ending='\r')
+                self.stdout.flush()
+
+        verb = "Would delete" if options['dry_run'] else "Deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {found} orphaned files ({freed / 1024 / 1024:.1f} MiB)."))
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from store import search
+
+
+def create_fts_schema(apps, schema_editor):
+    search.create_schema(schema_editor)
+
+
+def drop_fts_schema(apps, schema_editor):
+    search.drop_schema(schema_editor)
+
+
+def index_existing_products(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    ProductSearchDocument = apps.get_model('store', 'ProductSearchDocument')
+    products = Product.objects.filter(is_active=True).select_related('category').prefetch_related('variants')
+    ProductSearchDocument.objects.bulk_create([
+        ProductSearchDocument(
+            product_id=p.pk,
+            title=p.title,
+            description=p.description,
+            category=p.category.name,
+            skus=' '.join(v.sku for v in p.variants.all()),
+        )
+        for p in products.iterator(chunk_size=2000)
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_product_sort_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='store.product')),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True)),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('skus', models.TextField(blank=True)),
+            ],
+        ),
+        migrations.RunPython(create_fts_schema, drop_fts_schema),
+        migrations.RunPython(index_existing_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0009_product_sort_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='store.product')),
+                ('body', models.TextField()),
+                ('rendered_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:57
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0013_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=core.storage.upload_storage, upload_to='categories/'),
+        ),
+        migrations.AlterField(
+            model_name='collection',
+            name='image',
+            field=models.ImageField(help_text='Cover image for this collection', storage=core.storage.upload_storage, upload_to='collections/'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=core.storage.upload_storage, upload_to='products/'),
+        ),
+    ]
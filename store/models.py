@@ -1,7 +1,8 @@
 from django.db import models
 from django.utils.text import slugify
-from django.db.models import Avg, Sum
+from django.db.models import Exists, F, OuterRef, Prefetch, Sum
 from django.conf import settings
+from core.storage import upload_storage
 
 # --- 1. CORE CONFIGURATION ---
 class Color(models.Model):
@@ -28,7 +29,8 @@ class Category(models.Model):
 
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
-    image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    image = models.ImageField(upload_to='categories/', storage=upload_storage, blank=True, null=True)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)  # See store/derivatives.py
     description = models.TextField(blank=True)
     
     # 🔥 NEW: Gender field for Categories
@@ -53,7 +55,8 @@ class Collection(models.Model):
 
     title = models.CharField(max_length=100)  # e.g. "Gym Fit", "Travel Wear"
     slug = models.SlugField(unique=True, blank=True)
-    image = models.ImageField(upload_to='collections/', help_text="Cover image for this collection")
+    image = models.ImageField(upload_to='collections/', storage=upload_storage, help_text="Cover image for this collection")
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)  # See store/derivatives.py
     description = models.TextField(blank=True)
     
     # 🔥 NEW: Gender field for Collections
@@ -70,6 +73,44 @@ class Collection(models.Model):
         return f"{self.title} ({self.gender})"
 
 # --- 4. THE PRODUCT ---
+class ProductQuerySet(models.QuerySet):
+    def with_stock_status(self):
+        """Annotate `has_stock` so `in_stock` doesn't run a Sum per product."""
+        return self.annotate(
+            has_stock=Exists(ProductVariant.objects.filter(product=OuterRef('pk'), stock__gt=0))
+        )
+
+    # ProductSerializer field -> the long text column only it reads
+    TEXT_COLUMNS = {'description': 'description', 'features': 'features', 'careInstructions': 'care_instructions'}
+
+    def with_listing_data(self, fields=None):
+        """
+        Everything ProductSerializer reads, in a fixed number of queries per page.
+
+        With `fields` (a sparse fieldset, see serializers.requested_fields) only
+        the joins, prefetches and annotations those fields need are added, and
+        the long text columns they don't show are deferred.
+        """
+        def wants(*names):
+            return fields is None or any(name in fields for name in names)
+
+        queryset = self
+        if wants('category'):
+            queryset = queryset.select_related('category')
+        if wants('images', 'image', 'imageSrcset'):
+            queryset = queryset.prefetch_related(
+                Prefetch('images', queryset=ProductImage.objects.select_related('color'))
+            )
+        if wants('variants', 'colors', 'sizes'):
+            queryset = queryset.prefetch_related(
+                Prefetch('variants', queryset=ProductVariant.objects.select_related('color', 'size'))
+            )
+        if wants('inStock'):
+            queryset = queryset.with_stock_status()
+        deferred = [column for name, column in self.TEXT_COLUMNS.items() if not wants(name)]
+        return queryset.defer(*deferred) if deferred else queryset
+
+
 class Product(models.Model):
     # 🔥 UPDATED: Removed 'Unisex'
     GENDER_CHOICES = (('Men', 'Men'), ('Women', 'Women'))
@@ -104,38 +145,95 @@ class Product(models.Model):
     # Marketing
     badge = models.CharField(max_length=50, choices=BADGE_CHOICES, blank=True, null=True)
     is_active = models.BooleanField(default=True)
+
+    # Denormalized sort keys, kept fresh by store.stats (signals + refresh_product_stats)
+    rating_avg = models.FloatField(default=0, editable=False, help_text="Bayesian average rating")
+    units_sold_30d = models.PositiveIntegerField(default=0, editable=False)
+
+    # Review counters, updated with F() expressions on every review write (see store.signals)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    ratings_1 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_2 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_3 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_4 = models.PositiveIntegerField(default=0, editable=False)
+    ratings_5 = models.PositiveIntegerField(default=0, editable=False)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Back the keyset-paginated listing sorts (see ProductListView.SORT_OPTIONS)
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['rating_avg', 'id'], name='product_rating_id_idx'),
+            models.Index(fields=['units_sold_30d', 'id'], name='product_sold_id_idx'),
+        ]
+
+    # Only ever written in SQL (count_review, store.stats), never back from a possibly stale instance
+    DENORMALIZED_FIELDS = frozenset({
+        'rating_avg', 'units_sold_30d', 'rating_sum', 'rating_count',
+        'ratings_1', 'ratings_2', 'ratings_3', 'ratings_4', 'ratings_5',
+    })
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
+        if not self._state.adding and not args and kwargs.get('update_fields') is None \
+                and not kwargs.get('force_insert'):
+            # An edit must not undo review/sales updates made since this instance was loaded
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DENORMALIZED_FIELDS
+                and field.attname not in deferred
+            ]
         super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
     # --- DYNAMIC CALCULATIONS ---
+    # `in_stock` prefers the annotation from ProductQuerySet and only falls back
+    # to a query for instances loaded without it; the rating ones read counters.
     @property
     def in_stock(self):
+        if hasattr(self, 'has_stock'):
+            return self.has_stock
         total = self.variants.aggregate(total=Sum('stock'))['total']
         return (total or 0) > 0
 
     @property
     def average_rating(self):
-        avg = self.reviews.aggregate(Avg('rating'))['rating__avg']
-        return round(avg, 1) if avg else 0.0
+        return round(self.rating_sum / self.rating_count, 1) if self.rating_count else 0.0
 
     @property
     def review_count(self):
-        return self.reviews.count()
+        return self.rating_count
+
+    @property
+    def rating_histogram(self):
+        """{stars: number of reviews} for 5..1 stars."""
+        return {stars: getattr(self, f'ratings_{stars}') for stars in range(5, 0, -1)}
+
+    @classmethod
+    def count_review(cls, product_id, rating, delta):
+        """Add (delta=1) or remove (delta=-1) one `rating` review from the counters, in SQL."""
+        cls.objects.filter(pk=product_id).update(**{
+            'rating_sum': F('rating_sum') + rating * delta,
+            'rating_count': F('rating_count') + delta,
+            f'ratings_{rating}': F(f'ratings_{rating}') + delta,
+        })
 
 # --- 5. IMAGES (Linked to Colors) ---
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     color = models.ForeignKey(Color, on_delete=models.SET_NULL, null=True, blank=True, help_text="Link this image to a specific color variant")
-    image = models.ImageField(upload_to='products/')
+    image = models.ImageField(upload_to='products/', storage=upload_storage)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)  # See store/derivatives.py
     alt_text = models.CharField(max_length=255, blank=True)
     
     class Meta:
@@ -165,6 +263,28 @@ class ProductVariant(models.Model):
     def __str__(self):
         return f"{self.product.title} - {self.color.name}/{self.size.name}"
 
+# --- 6b. SEARCH INDEX SOURCE (see store/search.py) ---
+class ProductSearchDocument(models.Model):
+    """Denormalized text the full-text index is built from; maintained by store.signals."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    category = models.CharField(max_length=100, blank=True)
+    skus = models.TextField(blank=True)
+
+    def __str__(self):
+        return self.title
+
+# --- 6c. PRECOMPUTED DETAIL RESPONSES (see store/documents.py) ---
+class ProductDocument(models.Model):
+    """ProductSerializer output stored as JSON text; re-rendered in the background by store.signals."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='document')
+    body = models.TextField()
+    rendered_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Document for product #{self.product_id}"
+
 # --- 7. REVIEWS ---
 class Review(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reviews')
@@ -175,6 +295,10 @@ class Review(models.Model):
     purchased_variant = models.CharField(max_length=100, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Backs the keyset-paginated, newest-first review listing per product
+        indexes = [models.Index(fields=['product', 'created_at'], name='review_product_created_idx')]
+
     def __str__(self):
         return f"{self.rating}* - {self.product.title}"
 
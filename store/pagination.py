@@ -0,0 +1,168 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Opt-in seek ("keyset") pagination.
+
+    Only kicks in when the client sends `page_size` or `cursor`, so existing
+    callers keep receiving a plain list. The page is selected with a
+    `WHERE (a, id) > (last_a, last_id)` style predicate on the queryset's own
+    ordering instead of OFFSET, so deep pages cost the same as the first one.
+    Ordering fields must be concrete, non-null columns on the model.
+    """
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    default_page_size = 24
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                queryset = queryset.filter(self.seek_predicate(self.decode_cursor(cursor)))
+            except (ValidationError, ValueError):
+                raise NotFound("Invalid cursor")
+
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def page_bounds(self, request):
+        """
+        (after_id, rows) for a page over a plain `id` ordering, or None when
+        the request isn't paginated. Lets an id index prefetch just one page.
+        """
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+        cursor = params.get(self.cursor_query_param)
+        after_id = None
+        if cursor:
+            values = self.decode_cursor(cursor)
+            try:
+                after_id = int(values[0])
+            except (IndexError, TypeError, ValueError):
+                raise NotFound("Invalid cursor")
+        return after_id, self.get_page_size(request) + 1
+
+    def paginate_ranking(self, queryset, ranking, request):
+        """
+        paginate_queryset() for rows ordered by their id's position in
+        `ranking` (e.g. search relevance) instead of by columns: the cursor
+        holds the last row's position. The page is fetched with in_bulk().
+        """
+        params = request.query_params
+        if self.page_size_query_param not in params and self.cursor_query_param not in params:
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        start = 0
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                start = int(self.decode_cursor(cursor)[0]) + 1
+            except (IndexError, TypeError, ValueError):
+                raise NotFound("Invalid cursor")
+
+        matching = set(queryset.order_by().values_list('pk', flat=True))
+        positions = [position for position in range(start, len(ranking)) if ranking[position] in matching]
+        positions = positions[:self.page_size + 1]
+        rows = queryset.in_bulk([ranking[position] for position in positions])
+        self.has_next = len(positions) > self.page_size
+        self.page = []
+        for position in positions[:self.page_size]:
+            row = rows[ranking[position]]
+            row.ranking_position = position
+            self.page.append(row)
+        self.ordering = ['ranking_position']  # What encode_cursor() reads
+        return self.page
+
+    # --- Helpers ---
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.default_page_size))
+        except (TypeError, ValueError):
+            size = self.default_page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """The queryset's ordering, made total by appending the primary key."""
+        ordering = [str(f) for f in queryset.query.order_by] or ['id']
+        names = {f.lstrip('-') for f in ordering}
+        if not names & {'id', 'pk'}:
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
+
+    def seek_predicate(self, values):
+        """(a > x) OR (a = x AND b > y) OR ... for the current ordering."""
+        if len(values) != len(self.ordering):
+            raise NotFound("Invalid cursor")
+        predicate = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            predicate |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return predicate
+
+    def encode_cursor(self, obj):
+        values = [getattr(obj, f.lstrip('-')) for f in self.ordering]
+        raw = json.dumps([v if v is None else str(v) for v in values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound("Invalid cursor")
+        if not isinstance(values, list):
+            raise NotFound("Invalid cursor")
+        return values
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.page_size_query_param, self.page_size)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+
+class ReviewPagination(KeysetPagination):
+    """Keyset pages of reviews; same opt-in contract as the product listing."""
+    default_page_size = 10
+    max_page_size = 50
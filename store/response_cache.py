@@ -0,0 +1,212 @@
+"""
+Versioned response cache for the public catalog endpoints.
+
+Every cached response is keyed by its endpoint, its normalized query
+params and the current version of each namespace it depends on. Writes
+never delete cache entries; store.signals just bumps the affected
+namespaces (`bump()`), so every key built from the old version stops being
+read and ages out on its own. The bump happens once the writing transaction
+commits: a request served before that reads the old rows under the old
+version, never the old rows under the new one:
+
+    products                 any active product listing without a gender filter
+    products:gender:<g>      listings filtered to one gender
+    product:<pk>             one product's detail page
+    catalog                  shared lookups shown in or filtering listings
+                             (categories, collections, colors, sizes, sort stats)
+    categories, collections  CategoryListView / CollectionListView
+    config, content          SiteConfigView / web_content's public view
+
+A version is the time (ns) of the namespace's last bump, so it doubles as
+its Last-Modified.
+
+`CachedResponseMixin` wraps a view's GET. settings.STORE_RESPONSE_CACHE maps
+endpoint name -> timeout; a missing or 0 entry switches that endpoint off.
+Hit/miss counts are kept in the cache too, so they add up across worker
+processes (see `manage.py catalog_cache_stats`).
+
+`ConditionalGetMixin` answers If-None-Match / If-Modified-Since with a 304
+from the same versions, before the view touches a serializer.
+"""
+import hashlib
+import time
+from functools import wraps
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from .models import Product
+
+KEY_PREFIX = 'store:response'
+VERSION_PREFIX = 'store:version:'
+STATS_PREFIX = 'store:cache-stats:'
+
+
+GENDERS = {value.lower() for value, _ in Product.GENDER_CHOICES}
+
+
+def product_namespaces(pk, gender):
+    """The namespaces a change to product `pk` of `gender` must bump."""
+    return ['products', f'products:gender:{gender.lower()}', f'product:{pk}']
+
+
+def listing_namespaces(gender=None):
+    """The namespaces a product listing (optionally filtered by ?gender=) reads."""
+    gender = (gender or '').lower()
+    if gender in GENDERS:
+        return ['catalog', f'products:gender:{gender}']
+    return ['catalog', 'products']
+
+
+def versions(namespaces):
+    """Current version of each namespace, starting unknown (or evicted) ones at the current time."""
+    keys = [VERSION_PREFIX + ns for ns in namespaces]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, None)
+        found.update(cache.get_many(missing))
+    return [found.get(key, 0) for key in keys]
+
+
+def bump(*namespaces):
+    """New versions for `namespaces` once the current transaction commits (right away outside one)."""
+    def set_versions():
+        now = time.time_ns()
+        cache.set_many({VERSION_PREFIX + ns: now for ns in namespaces}, None)
+    transaction.on_commit(set_versions)
+
+
+def cache_key(endpoint, namespaces, params):
+    signature = repr((sorted(params), versions(namespaces)))
+    return f'{KEY_PREFIX}:{endpoint}:' + hashlib.md5(signature.encode()).hexdigest()
+
+
+def request_params(request):
+    """Normalized query params plus the origin (bodies carry absolute image URLs)."""
+    params = [(key, value) for key, values in request.query_params.lists() for value in values if value]
+    params.append(('origin', request.build_absolute_uri('/')))
+    return params
+
+
+def record(endpoint, outcome):
+    key = f'{STATS_PREFIX}{endpoint}:{outcome}'
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def stats():
+    """{endpoint: {'hit': n, 'miss': n}} for every configured endpoint."""
+    endpoints = getattr(settings, 'STORE_RESPONSE_CACHE', {})
+    keys = [f'{STATS_PREFIX}{endpoint}:{outcome}' for endpoint in endpoints for outcome in ('hit', 'miss')]
+    counts = cache.get_many(keys)
+    return {
+        endpoint: {outcome: counts.get(f'{STATS_PREFIX}{endpoint}:{outcome}', 0) for outcome in ('hit', 'miss')}
+        for endpoint in endpoints
+    }
+
+
+def reset_stats():
+    cache.delete_many([
+        f'{STATS_PREFIX}{endpoint}:{outcome}'
+        for endpoint in getattr(settings, 'STORE_RESPONSE_CACHE', {}) for outcome in ('hit', 'miss')
+    ])
+
+
+class CachedResponseMixin:
+    """
+    Cache a view's rendered JSON GET responses.
+
+    Subclasses set `cache_endpoint` (the STORE_RESPONSE_CACHE entry) and
+    return the namespaces they read from `get_cache_namespaces()`.
+    """
+    cache_endpoint = None
+    CACHED_HEADERS = ('X-Did-You-Mean',)
+
+    def get_cache_namespaces(self):
+        raise NotImplementedError
+
+    def cache_timeout(self):
+        return getattr(settings, 'STORE_RESPONSE_CACHE', {}).get(self.cache_endpoint) or 0
+
+    def get(self, request, *args, **kwargs):
+        timeout = self.cache_timeout()
+        if not timeout or request.accepted_renderer.format != 'json':
+            return super().get(request, *args, **kwargs)
+
+        key = cache_key(self.cache_endpoint, self.get_cache_namespaces(), request_params(request))
+        cached = cache.get(key)
+        if cached is not None:
+            record(self.cache_endpoint, 'hit')
+            body, headers = cached
+            return self._cached_response(body, headers, 'HIT')
+
+        record(self.cache_endpoint, 'miss')
+        response = super().get(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        body = request.accepted_renderer.render(response.data, request.accepted_media_type, self.get_renderer_context())
+        headers = {name: response[name] for name in self.CACHED_HEADERS if response.has_header(name)}
+        cache.set(key, (body, headers), timeout)
+        return self._cached_response(body, headers, 'MISS')
+
+    def _cached_response(self, body, headers, outcome):
+        response = HttpResponse(body, content_type='application/json', headers=headers)
+        response['X-Cache'] = outcome
+        return response
+
+
+def conditional_get(method):
+    """
+    Decorate a view's get() to send validators and answer 304s.
+
+    ConditionalGetMixin applies it to the inherited get(); views that write
+    their own get() decorate it directly.
+    """
+    @wraps(method)
+    def wrapper(view, request, *args, **kwargs):
+        validators = view.get_validators(request)
+        if validators is None:
+            return method(view, request, *args, **kwargs)
+        source, modified = validators
+        etag = '"%s"' % hashlib.md5(repr(source).encode()).hexdigest()
+        last_modified = int(modified.timestamp())
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = method(view, request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """
+    Strong ETag / Last-Modified validators from namespace versions, with 304s.
+
+    Views return their namespaces from `get_cache_namespaces()`, or override
+    `get_validators()` to return (etag source, last-modified datetime) or
+    None to skip validation for this request.
+    """
+
+    def get_validators(self, request):
+        stamps = versions(self.get_cache_namespaces())
+        source = (type(self).__name__, sorted(request_params(request)), stamps, request.accepted_renderer.format)
+        return source, datetime.fromtimestamp(max(stamps) / 1e9, tz=timezone.utc)
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
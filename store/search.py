@@ -0,0 +1,197 @@
+"""
+Full-text product search.
+
+Each product gets one ProductSearchDocument row (title, description,
+category name and variant SKUs). The database indexes those rows:
+
+* SQLite: an FTS5 external-content table (`store_product_fts`) kept in sync
+  by triggers, ranked with bm25().
+* PostgreSQL: a generated, weighted `search_vector` tsvector column with a
+  GIN index, ranked with ts_rank_cd().
+
+Both are created by migration 0008. When neither is available (e.g. an
+SQLite build without FTS5), `ranked_product_ids` returns None and callers
+fall back to the old icontains filter.
+
+Matching is by word prefix, not substring: every word of the query must
+start a word of the document ("pol tsh" finds "Polo Tshirt"), while the
+icontains fallback also matched inside words ("olo", "shirt" in
+"Tshirt"). SKUs are tokenized on punctuation, so "101-blk" matches SKU
+101-BLK-XL.
+"""
+import re
+
+from django.db import DatabaseError, connection, transaction
+
+FTS_TABLE = 'store_product_fts'
+DOCUMENT_TABLE = 'store_productsearchdocument'
+
+# Relevance weights: title, description, category, skus
+BM25_WEIGHTS = (10.0, 1.0, 4.0, 8.0)
+
+# Search results are capped to the N most relevant products
+RESULT_LIMIT = 1000
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or '').lower())
+
+
+def backend():
+    """'sqlite', 'postgresql' or None when no full-text index exists."""
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            if cursor.fetchone():
+                return 'sqlite'
+    return None
+
+
+# --- Schema (used by migrations) ---
+SQLITE_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, description, category, skus,
+        content='{DOCUMENT_TABLE}', content_rowid='product_id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description, category, skus)
+        VALUES (new.product_id, new.title, new.description, new.category, new.skus);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, category, skus)
+        VALUES ('delete', old.product_id, old.title, old.description, old.category, old.skus);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {DOCUMENT_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description, category, skus)
+        VALUES ('delete', old.product_id, old.title, old.description, old.category, old.skus);
+        INSERT INTO {FTS_TABLE}(rowid, title, description, category, skus)
+        VALUES (new.product_id, new.title, new.description, new.category, new.skus);
+    END""",
+]
+
+POSTGRES_SCHEMA = [
+    f"""ALTER TABLE {DOCUMENT_TABLE} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(skus, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(category, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED""",
+    f"CREATE INDEX {DOCUMENT_TABLE}_vector_idx ON {DOCUMENT_TABLE} USING GIN (search_vector)",
+]
+
+
+def create_schema(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_SCHEMA
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_SCHEMA[0])
+        except DatabaseError:
+            return  # SQLite built without FTS5: search falls back to icontains
+        statements = SQLITE_SCHEMA[1:]
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_schema(schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    # PostgreSQL: the column and index go away with the documents table
+
+
+# --- Index maintenance ---
+def build_documents(products):
+    """ProductSearchDocument instances for products with `category` and `variants` loaded."""
+    from .models import ProductSearchDocument
+    return [
+        ProductSearchDocument(
+            product_id=p.pk,
+            title=p.title,
+            description=p.description,
+            category=p.category.name,
+            skus=' '.join(v.sku for v in p.variants.all()),
+        )
+        for p in products
+    ]
+
+
+def index_products(product_ids):
+    """(Re)index the given products; inactive or missing ones are removed."""
+    from .models import Product, ProductSearchDocument
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    products = (Product.objects.filter(pk__in=product_ids, is_active=True)
+                .select_related('category').prefetch_related('variants'))
+    with transaction.atomic():
+        ProductSearchDocument.objects.filter(product_id__in=product_ids).delete()
+        ProductSearchDocument.objects.bulk_create(build_documents(products))
+
+
+def rebuild_index(batch_size=2000, progress=None):
+    """Drop and regenerate every document, then compact the FTS index."""
+    from .models import Product, ProductSearchDocument
+    total = 0
+    with transaction.atomic():
+        ProductSearchDocument.objects.all().delete()
+        queryset = (Product.objects.filter(is_active=True).order_by('pk')
+                    .select_related('category').prefetch_related('variants'))
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            ProductSearchDocument.objects.bulk_create(build_documents(batch))
+            last_pk = batch[-1].pk
+            total += len(batch)
+            if progress:
+                progress(total)
+    if backend() == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+# --- Querying ---
+def order_by_ranking(rows, ranking):
+    """`rows` (products) sorted by their id's position in `ranking`, ids missing from it last."""
+    position = {pk: index for index, pk in enumerate(ranking)}
+    return sorted(rows, key=lambda row: position.get(row.pk, len(position)))
+
+
+def ranked_product_ids(query, limit=RESULT_LIMIT):
+    """
+    Product ids matching every word of `query` (as prefixes), best match first.
+    Returns None when there is no full-text index to query.
+    """
+    engine = backend()
+    if engine is None:
+        return None
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+
+    if engine == 'sqlite':
+        match = ' '.join('"%s"*' % t for t in tokens)
+        weights = ', '.join(str(w) for w in BM25_WEIGHTS)
+        sql = (f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+               f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s")
+        params = [match, limit]
+    else:
+        sql = (f"SELECT product_id FROM {DOCUMENT_TABLE}, to_tsquery('simple', %s) query "
+               f"WHERE search_vector @@ query ORDER BY ts_rank_cd(search_vector, query) DESC LIMIT %s")
+        params = [' & '.join('%s:*' % t for t in tokens), limit]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
@@ -1,17 +1,49 @@
 from rest_framework import serializers
-from .models import Product, Category, Collection, ProductImage, ProductVariant, Color, Size, Review
+from .models import Product, Category, Collection, ProductImage, ProductVariant, Review
 from .models import Coupon, SiteConfig
+from . import derivatives
+from core.storage import media_urls
+
+
+def image_srcset(serializer, field_file, record):
+    """Resized versions of an image (see store/derivatives.py), with absolute URLs like `image`."""
+    request = serializer.context.get('request')
+    return derivatives.srcset(field_file, record, media_urls(request)) if request else None
+
+
+class MediaImageField(serializers.ImageField):
+    """ImageField whose URLs come from core.storage.media_urls (MEDIA_BASE_URL / CDN aware)."""
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        return media_urls(request)(value.name) if request else value.url
+
+
+class SrcsetMixin:
+    """`srcset` for serializers of a model with `image` and `derivatives`."""
+
+    def get_srcset(self, obj):
+        return image_srcset(self, obj.image, obj.derivatives)
+
 
 # ... (Keep CategorySerializer, CollectionSerializer, ReviewSerializer as they were) ...
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SrcsetMixin, serializers.ModelSerializer):
+    image = MediaImageField(required=False, allow_null=True)
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'image', 'is_featured','gender']
+        fields = ['id', 'name', 'slug', 'image', 'srcset', 'is_featured','gender']
+
+class CollectionSerializer(SrcsetMixin, serializers.ModelSerializer):
+    image = MediaImageField()
+    srcset = serializers.SerializerMethodField()
 
-class CollectionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Collection
-        fields = ['id', 'title', 'slug', 'image', 'description']
+        fields = ['id', 'title', 'slug', 'image', 'srcset', 'description']
 
 
 
@@ -44,6 +76,22 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 # --- MAIN PRODUCT SERIALIZER ---
 # --- MAIN PRODUCT SERIALIZER ---
+def requested_fields(request):
+    """
+    The ProductSerializer fields asked for by `?view=card` or `?fields=a,b`,
+    or None for the full representation.
+    """
+    if request.query_params.get('view') == 'card':
+        return ProductSerializer.CARD_FIELDS
+    names = [name.strip() for name in request.query_params.get('fields', '').split(',') if name.strip()]
+    if not names:
+        return None
+    unknown = [name for name in names if name not in ProductSerializer.Meta.fields + ProductSerializer.EXTRA_FIELDS]
+    if unknown:
+        raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(unknown)}"})
+    return names
+
+
 class ProductSerializer(serializers.ModelSerializer):
     category = serializers.CharField(source='category.name')
     originalPrice = serializers.DecimalField(source='original_price', max_digits=10, decimal_places=2)
@@ -71,17 +119,46 @@ class ProductSerializer(serializers.ModelSerializer):
             'fabric', 'fit', 'inStock'
         ]
 
+    # Sparse fieldsets: pass context['fields'] (see requested_fields) to keep only those.
+    # `image` (the first image's URL) and `imageSrcset` are only available that way, for grid cards.
+    EXTRA_FIELDS = ['image', 'imageSrcset']
+    CARD_FIELDS = ['id', 'name', 'slug', 'price', 'image', 'imageSrcset', 'inStock']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = self.context.get('fields')
+        if fields is not None:
+            for name in self.EXTRA_FIELDS:
+                if name in fields:
+                    self.fields[name] = serializers.SerializerMethodField()
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     def to_representation(self, instance):
         data = super().to_representation(instance)
-        data['id'] = str(instance.id)
+        if 'id' in data:
+            data['id'] = str(instance.id)
         return data
 
+    def get_image(self, obj):
+        request = self.context.get('request')
+        image = next(iter(obj.images.all()), None)
+        if request and image:
+            return media_urls(request)(image.image.name)
+        return None
+
+    def get_imageSrcset(self, obj):
+        image = next(iter(obj.images.all()), None)
+        return image_srcset(self, image.image, image.derivatives) if image else None
+
     def get_images(self, obj):
         request = self.context.get('request')
         if request:
+            urls = media_urls(request)
             return [
                 {
-                    "url": request.build_absolute_uri(img.image.url),
+                    "url": urls(img.image.name),
+                    "srcset": image_srcset(self, img.image, img.derivatives),
                     "color": img.color.name if img.color else None
                 } 
                 for img in obj.images.all()
@@ -100,13 +177,18 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
 
     # --- 🔥 FIXED: NESTED SIZES INSIDE COLORS ---
+    # Built from the prefetched variants (see Product.objects.with_listing_data)
+    # instead of a distinct-colors query plus one variants query per color.
     def get_colors(self, obj):
+        variants_by_color = {}
+        for variant in obj.variants.all():
+            variants_by_color.setdefault(variant.color, []).append(variant)
+
         colors_data = []
-        distinct_colors = Color.objects.filter(productvariant__product=obj).distinct()
+        # Color id order, as the distinct-colors query walked the (product, color, size) index
+        for color, variants in sorted(variants_by_color.items(), key=lambda item: item[0].pk):
+            variants.sort(key=lambda v: v.size.sort_order)
 
-        for color in distinct_colors:
-            variants = obj.variants.filter(color=color).order_by('size__sort_order')
-            
             sizes_data = []
             for variant in variants:
                 # 🔥 FIX: Add the override to the base price instead of replacing it
@@ -130,7 +212,9 @@ class ProductSerializer(serializers.ModelSerializer):
         return colors_data
     def get_sizes(self, obj):
         # Global list of sizes (all sizes available for this product regardless of color)
-        return [{'size': s.name, 'inStock': True} for s in Size.objects.filter(productvariant__product=obj).distinct()]
+        distinct_sizes = {v.size.pk: v.size for v in obj.variants.all()}
+        sizes = sorted(distinct_sizes.values(), key=lambda s: s.sort_order)
+        return [{'size': s.name, 'inStock': True} for s in sizes]
 
     def get_features(self, obj):
         return obj.features.split('\n') if obj.features else []
@@ -0,0 +1,199 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import change_log, derivatives, documents, response_cache, search, stats
+from .models import Category, Collection, Color, Product, ProductImage, ProductVariant, Review, SiteConfig, Size
+
+
+def _deleting_product(origin):
+    """True when a delete signal is part of a Product cascade (origin is a Product or Product queryset)."""
+    return getattr(origin, 'model', type(origin)) is Product
+
+
+# --- Full-text search index ---
+@receiver(post_save, sender=Product)
+def index_saved_product(sender, instance, **kwargs):
+    search.index_products([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+def index_variant_product(sender, instance, origin=None, **kwargs):
+    # SKUs are part of the document. Skip cascades, the document goes with the product.
+    if _deleting_product(origin):
+        return
+    search.index_products([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+def index_category_products(sender, instance, created, **kwargs):
+    if not created:
+        search.index_products(instance.products.values_list('pk', flat=True))
+
+
+# --- In-memory catalog indexes (bitmaps, "did you mean", autocomplete; see store/change_log.py) ---
+@receiver([post_save, post_delete], sender=Product)
+def log_product_change(sender, instance, **kwargs):
+    change_log.record(('product', instance.pk))
+
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+def log_variant_change(sender, instance, origin=None, **kwargs):
+    if not _deleting_product(origin):  # The product's own entry covers the cascade
+        change_log.record(('product', instance.product_id))
+
+
+@receiver(m2m_changed, sender=Product.collections.through)
+def log_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        change_log.record(('product', instance.pk))
+    elif pk_set:
+        change_log.record(*(('product', product_id) for product_id in pk_set))
+    else:
+        change_log.record(('all', None))  # Collection cleared: we no longer know which products it had
+
+
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Collection)
+@receiver([post_save, post_delete], sender=Color)
+@receiver([post_save, post_delete], sender=Size)
+def log_lookup_change(sender, instance, **kwargs):
+    change_log.record((sender._meta.model_name, instance.pk))
+
+
+# --- Review counters (must run before the rating sort key below) ---
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    if instance.pk:
+        instance._saved_rating = Review.objects.filter(pk=instance.pk).values_list('product_id', 'rating').first()
+
+
+@receiver(post_save, sender=Review)
+def count_saved_review(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, '_saved_rating', None)
+    if previous == (instance.product_id, instance.rating):
+        return
+    if previous:
+        Product.count_review(*previous, -1)
+    Product.count_review(instance.product_id, instance.rating, 1)
+
+
+@receiver(post_delete, sender=Review)
+def uncount_deleted_review(sender, instance, origin=None, **kwargs):
+    if not _deleting_product(origin):
+        Product.count_review(instance.product_id, instance.rating, -1)
+
+
+# --- Sort keys (rating_avg / units_sold_30d) ---
+@receiver([post_save, post_delete], sender=Review)
+def refresh_product_rating(sender, instance, origin=None, **kwargs):
+    if not _deleting_product(origin):
+        stats.refresh_ratings([instance.product_id])
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_sales(sender, instance, **kwargs):
+    # Sales are matched by title, so a new or renamed product may already have some
+    stats.refresh_sales([instance.title])
+
+
+# --- Precomputed detail documents ---
+@receiver(post_save, sender=Product)
+def render_product_document(sender, instance, **kwargs):
+    documents.schedule([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=Review)
+def render_related_document(sender, instance, origin=None, **kwargs):
+    if not _deleting_product(origin):
+        documents.schedule([instance.product_id])
+
+
+@receiver(post_save, sender=Category)
+def render_category_documents(sender, instance, created, **kwargs):
+    if not created:
+        documents.schedule(instance.products.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Color)
+@receiver(post_save, sender=Size)
+def render_variant_lookup_documents(sender, instance, created, **kwargs):
+    if not created:
+        lookup = {sender._meta.model_name: instance}
+        documents.schedule(ProductVariant.objects.filter(**lookup).values_list('product_id', flat=True).distinct())
+
+
+@receiver(pre_delete, sender=Color)
+def render_color_image_documents(sender, instance, **kwargs):
+    # Image colors are SET_NULL by an UPDATE that sends no signals of its own
+    documents.schedule(ProductImage.objects.filter(color=instance).values_list('product_id', flat=True).distinct())
+
+
+# --- Resized images (see store/derivatives.py) ---
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Collection)
+def render_image_derivatives(sender, instance, **kwargs):
+    derivatives.schedule(instance)
+
+
+# --- Response cache versions (see store/response_cache.py) ---
+@receiver(pre_save, sender=Product)
+def remember_product_gender(sender, instance, **kwargs):
+    # A product moving between genders leaves the old gender's listings stale too
+    if instance.pk:
+        instance._saved_gender = Product.objects.filter(pk=instance.pk).values_list('gender', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Product)
+def bump_product_versions(sender, instance, **kwargs):
+    namespaces = response_cache.product_namespaces(instance.pk, instance.gender)
+    previous = getattr(instance, '_saved_gender', None)
+    if previous and previous != instance.gender:
+        namespaces += response_cache.product_namespaces(instance.pk, previous)
+    response_cache.bump(*namespaces)
+
+
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=Review)
+def bump_related_product_versions(sender, instance, origin=None, **kwargs):
+    if _deleting_product(origin):
+        return  # bump_product_versions covers the cascade
+    gender = Product.objects.filter(pk=instance.product_id).values_list('gender', flat=True).first()
+    if gender:
+        response_cache.bump(*response_cache.product_namespaces(instance.product_id, gender))
+
+
+@receiver(m2m_changed, sender=Product.collections.through)
+def bump_membership_versions(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        response_cache.bump('catalog')  # A collection gained or lost products
+    else:
+        response_cache.bump(*response_cache.product_namespaces(instance.pk, instance.gender))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def bump_category_versions(sender, **kwargs):
+    response_cache.bump('categories', 'catalog')
+
+
+@receiver([post_save, post_delete], sender=Collection)
+def bump_collection_versions(sender, **kwargs):
+    response_cache.bump('collections', 'catalog')
+
+
+@receiver([post_save, post_delete], sender=Color)
+@receiver([post_save, post_delete], sender=Size)
+def bump_lookup_versions(sender, **kwargs):
+    response_cache.bump('catalog')
+
+
+@receiver([post_save, post_delete], sender=SiteConfig)
+def bump_config_version(sender, **kwargs):
+    response_cache.bump('config')
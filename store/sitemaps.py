@@ -0,0 +1,156 @@
+"""
+Sharded XML sitemaps, written as static files under MEDIA_ROOT/sitemaps/.
+
+    sitemap.xml        sitemap index listing every shard
+    products-<n>.xml   active products with pk in ((n-1)*SHARD_SIZE, n*SHARD_SIZE]
+    pages.xml          categories and active collections
+
+Product shards are fixed pk ranges, so a product always lands in the same
+shard and none can outgrow the 50,000-URL limit. Each shard is streamed to
+disk from a keyset-paginated query, with <lastmod> from Product.updated_at.
+
+`build()` (run by `manage.py build_sitemaps`, e.g. from cron) is
+incremental: one GROUP BY query fingerprints every product shard by
+(active count, latest updated_at), and only shards whose fingerprint moved
+since manifest.json are rewritten. Additions and edits move the latest
+updated_at; removals and deactivations move the count.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime
+from urllib.parse import urljoin
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, F, Max
+
+from .models import Category, Collection, Product
+
+SHARD_SIZE = 50000
+QUERY_BATCH = 2000
+DIRECTORY = 'sitemaps'
+FRONTEND_PATHS = {
+    'product': '/product/{slug}',
+    'category': '/category/{slug}',
+    'collection': '/collection/{slug}',
+}
+
+URLSET_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+
+
+def frontend_url(kind, slug):
+    """Public storefront URL of a product / category / collection page."""
+    paths = {**FRONTEND_PATHS, **getattr(settings, 'STORE_FRONTEND_PATHS', {})}
+    return settings.FRONTEND_URL + paths[kind].format(slug=slug)
+
+
+def directory():
+    return os.path.join(settings.MEDIA_ROOT, DIRECTORY)
+
+
+def _url(loc, lastmod=None):
+    entry = f'<url><loc>{escape(loc)}</loc>'
+    if lastmod:
+        entry += f'<lastmod>{lastmod.isoformat(timespec="seconds")}</lastmod>'
+    return entry + '</url>\n'
+
+
+def _write(name, chunks):
+    """Stream `chunks` into sitemaps/<name>, replacing the old file only once it's complete."""
+    path = os.path.join(directory(), name)
+    with open(path + '.partial', 'w', encoding='utf-8') as f:
+        f.writelines(chunks)
+    os.replace(path + '.partial', path)
+
+
+def product_fingerprints():
+    """{shard number: [active product count, latest updated_at ISO]} in one query."""
+    rows = (
+        Product.objects.filter(is_active=True).order_by()
+        .annotate(shard=(F('pk') - 1) / SHARD_SIZE + 1)
+        .values('shard').annotate(count=Count('pk'), lastmod=Max('updated_at'))
+    )
+    return {row['shard']: [row['count'], row['lastmod'].isoformat()] for row in rows}
+
+
+def product_shard(shard):
+    """Yield the shard's XML, reading its pk range in keyset batches."""
+    yield URLSET_OPEN
+    last_pk, end = (shard - 1) * SHARD_SIZE, shard * SHARD_SIZE
+    products = Product.objects.filter(is_active=True).order_by('pk')
+    while True:
+        batch = list(products.filter(pk__gt=last_pk, pk__lte=end).values_list('pk', 'slug', 'updated_at')[:QUERY_BATCH])
+        if not batch:
+            break
+        yield ''.join(_url(frontend_url('product', slug), updated_at) for _, slug, updated_at in batch)
+        last_pk = batch[-1][0]
+    yield URLSET_CLOSE
+
+
+def page_urls():
+    categories = Category.objects.order_by('pk').values_list('slug', flat=True)
+    collections = Collection.objects.filter(is_active=True).order_by('pk').values_list('slug', flat=True)
+    return [frontend_url('category', slug) for slug in categories] + \
+        [frontend_url('collection', slug) for slug in collections]
+
+
+def _load_manifest():
+    try:
+        with open(os.path.join(directory(), 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build(base_url, force=False):
+    """
+    Bring the sitemap files up to date; returns the names of the files written.
+
+    `base_url` is the public origin MEDIA_URL is served from (shard <loc>s
+    in the index are absolute).
+    """
+    os.makedirs(directory(), exist_ok=True)
+    manifest = _load_manifest()
+    shards = manifest.get('shards', {})
+    # Every <loc> changes with the storefront or media origin
+    origins = [settings.FRONTEND_URL, base_url]
+    if force or manifest.get('origins') != origins:
+        shards = {}
+    written = []
+
+    fingerprints = {f'products-{shard}.xml': fp for shard, fp in product_fingerprints().items()}
+    for name, fingerprint in sorted(fingerprints.items()):
+        if shards.get(name, {}).get('fingerprint') != fingerprint or not os.path.exists(os.path.join(directory(), name)):
+            _write(name, product_shard(int(name[len('products-'):-len('.xml')])))
+            written.append(name)
+        lastmod = datetime.fromisoformat(fingerprint[1]).isoformat(timespec='seconds')
+        shards[name] = {'fingerprint': fingerprint, 'lastmod': lastmod}
+
+    urls = page_urls()
+    fingerprint = hashlib.md5('\n'.join(urls).encode()).hexdigest()
+    if shards.get('pages.xml', {}).get('fingerprint') != fingerprint:
+        _write('pages.xml', [URLSET_OPEN, *(_url(url) for url in urls), URLSET_CLOSE])
+        written.append('pages.xml')
+    shards['pages.xml'] = {'fingerprint': fingerprint, 'lastmod': None}
+
+    # Shards whose products are all gone or inactive
+    for name in [name for name in shards if name.startswith('products-') and name not in fingerprints]:
+        del shards[name]
+        try:
+            os.remove(os.path.join(directory(), name))
+        except FileNotFoundError:
+            pass
+        written.append(name)
+
+    if written:
+        shard_base = urljoin(base_url.rstrip('/') + '/', f'{settings.MEDIA_URL.strip("/")}/{DIRECTORY}/')
+        index = ['<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+        for name, entry in sorted(shards.items()):
+            lastmod = f'<lastmod>{entry["lastmod"]}</lastmod>' if entry['lastmod'] else ''
+            index.append(f'<sitemap><loc>{escape(shard_base + name)}</loc>{lastmod}</sitemap>\n')
+        index.append('</sitemapindex>\n')
+        _write('sitemap.xml', index)
+        _write('manifest.json', [json.dumps({'origins': origins, 'shards': shards}, indent=1)])
+    return written
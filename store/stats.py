@@ -0,0 +1,148 @@
+"""
+Denormalized product sort keys: `Product.rating_avg` and `Product.units_sold_30d`,
+plus the review counters (`rating_sum`, `rating_count`, `ratings_1..5`) they start from.
+
+ProductListView sorts on these indexed columns so `?sort=rating` and
+`?sort=popularity` never aggregate reviews or orders at request time.
+store.signals / orders.signals refresh the affected products on every review
+or order change; `manage.py refresh_product_stats` recomputes everything and
+should run periodically (e.g. nightly cron), since sales age out of the
+30-day window without any write happening and the rating prior (the
+store-wide mean, cached between runs) drifts.
+
+The review counters themselves are kept exact by store.signals with F()
+updates; `manage.py repair_review_counters` recounts them from the reviews
+table if they were ever bypassed (raw SQL, bulk_create, QuerySet.update).
+"""
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from . import documents, response_cache
+from .models import Product, Review
+
+# Bayesian average: every product starts with PRIOR_WEIGHT virtual reviews at
+# the store-wide mean, so one 5-star review doesn't outrank fifty 4.8s.
+PRIOR_WEIGHT = 5
+# The store-wide mean moves slowly, so review writes read it from the cache instead of summing every
+# product; a full refresh_ratings() (refresh_product_stats) recomputes it
+PRIOR_MEAN_KEY = 'store:stats:prior-mean'
+PRIOR_MEAN_TIMEOUT = 24 * 60 * 60
+SALES_WINDOW_DAYS = 30
+BATCH_SIZE = 1000
+
+
+def bayesian_rating(total, count, prior_mean):
+    if not count:
+        return 0.0  # Unreviewed products sort after reviewed ones
+    return round((PRIOR_WEIGHT * prior_mean + total) / (PRIOR_WEIGHT + count), 4)
+
+
+def _save_changed(field, values, product_ids=None):
+    """Write `values` ({pk: value}, missing pks mean 0) to rows where they differ."""
+    products = Product.objects.order_by()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    changed = [
+        Product(pk=pk, **{field: values.get(pk, 0)})
+        for pk, current in products.values_list('pk', field).iterator()
+        if current != values.get(pk, 0)
+    ]
+    # bulk_update skips save() and its signals: these columns don't touch the search or catalog indexes
+    Product.objects.bulk_update(changed, [field], batch_size=BATCH_SIZE)
+    if changed:
+        response_cache.bump('catalog')  # Reorders ?sort=rating / ?sort=popularity listings
+    return len(changed)
+
+
+def prior_mean(refresh=False):
+    """Store-wide mean rating, from the cache unless missing or `refresh`."""
+    mean = None if refresh else cache.get(PRIOR_MEAN_KEY)
+    if mean is None:
+        totals = Product.objects.aggregate(total=Sum('rating_sum'), count=Sum('rating_count'))
+        if not totals['count']:
+            return 0  # Not cached: the first reviews should set it
+        mean = totals['total'] / totals['count']
+        cache.set(PRIOR_MEAN_KEY, mean, PRIOR_MEAN_TIMEOUT)
+    return mean
+
+
+def refresh_ratings(product_ids=None):
+    """
+    Recompute `rating_avg` for `product_ids` (all products if None); returns
+    rows changed. Only a full refresh recomputes the prior mean.
+    """
+    prior = prior_mean(refresh=product_ids is None)
+    products = Product.objects.order_by().filter(rating_count__gt=0)
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        products = products.filter(pk__in=product_ids)
+    ratings = {
+        pk: bayesian_rating(total, count, prior)
+        for pk, total, count in products.values_list('pk', 'rating_sum', 'rating_count').iterator()
+    }
+    return _save_changed('rating_avg', ratings, product_ids)
+
+
+def repair_review_counters(product_ids=None):
+    """
+    Recompute the review counters (rating_sum, rating_count, ratings_1..5)
+    from the reviews table for `product_ids` (all if None); returns rows changed.
+    """
+    reviews = Review.objects.order_by().values('product')
+    products = Product.objects.order_by()
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        reviews = reviews.filter(product__in=product_ids)
+        products = products.filter(pk__in=product_ids)
+    star_counts = {f'ratings_{stars}': Count('id', filter=Q(rating=stars)) for stars in range(1, 6)}
+    counted = {
+        row.pop('product'): row
+        for row in reviews.annotate(rating_sum=Sum('rating'), rating_count=Count('id'), **star_counts)
+    }
+    fields = ['rating_sum', 'rating_count', *star_counts]
+    empty = dict.fromkeys(fields, 0)
+    changed = []
+    for row in products.values('pk', *fields).iterator():
+        expected = counted.get(row['pk'], empty)
+        if any(row[field] != expected[field] for field in fields):
+            changed.append(Product(pk=row['pk'], **expected))
+    Product.objects.bulk_update(changed, fields, batch_size=BATCH_SIZE)
+    if changed:
+        response_cache.bump('catalog')  # Ratings show in every listing
+        documents.schedule([product.pk for product in changed])
+    return len(changed)
+
+
+def sold_items():
+    """Order lines that count as sales: placed in the window, paid (or COD), not cancelled or returned."""
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    since = timezone.now() - timedelta(days=SALES_WINDOW_DAYS)
+    return (
+        OrderItem.objects
+        .filter(order__created_at__gte=since)
+        .filter(Q(order__payment_status='Paid') | Q(order__payment_method='COD'))
+        .exclude(order__order_status='Cancelled')
+        .exclude(status='Returned')
+    )
+
+
+def refresh_sales(titles=None):
+    """
+    Recompute `units_sold_30d` for products titled `titles` (all products if None).
+
+    Order lines only keep the product title, so sales are matched by title.
+    """
+    items = sold_items().order_by()
+    products = Product.objects.order_by()
+    if titles is not None:
+        titles = set(titles)
+        items = items.filter(product_name__in=titles)
+        products = products.filter(title__in=titles)
+    units = dict(items.values('product_name').annotate(units=Sum('quantity')).values_list('product_name', 'units'))
+    matched = list(products.values_list('pk', 'title'))
+    sales = {pk: units[title] for pk, title in matched if title in units}
+    return _save_changed('units_sold_30d', sales, None if titles is None else [pk for pk, _ in matched])
@@ -0,0 +1,55 @@
+"""
+A minimal in-process background worker for store housekeeping (e.g. the
+precomputed product documents in store.documents).
+
+`defer(func, *args)` runs `func` on a small thread pool once the current
+transaction commits, so request handlers never wait on it and the worker
+never sees uncommitted rows. Set STORE_TASKS_EAGER to run tasks inline
+instead (management commands, benchmarks, debugging). Tasks are lost if the
+process exits before they run, so everything scheduled here must be
+recoverable by a rebuild command or a lazy fallback.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'STORE_TASK_WORKERS', 1), thread_name_prefix='store-tasks'
+            )
+        return _executor
+
+
+def _call(func, args):
+    close_old_connections()
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background task %s failed", getattr(func, '__name__', func))
+    finally:
+        connections.close_all()  # Worker threads keep their own connections; don't leak them
+
+
+def run(func, *args):
+    """Run `func(*args)` in the background worker now (inline when STORE_TASKS_EAGER)."""
+    if getattr(settings, 'STORE_TASKS_EAGER', False):
+        func(*args)
+    else:
+        _get_executor().submit(_call, func, args)
+
+
+def defer(func, *args):
+    """Run `func(*args)` in the background once the current transaction commits."""
+    transaction.on_commit(lambda: run(func, *args))
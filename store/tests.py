@@ -1,3 +1,272 @@
-from django.test import TestCase
+import multiprocessing
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import CustomUser
+
+from . import autocomplete, bitmap, change_log, fuzzy, inventory, stats
+from .models import Category, Color, Product, ProductVariant, Review, Size
+from .serializers import ProductSerializer
+
+
+COLORS = ('Navy', 'Black', 'Olive', 'White')
+
+
+def make_variants(*stocks):
+    """One product with a variant (own color, one size) per entry of `stocks`."""
+    category = Category.objects.create(name='Polo Tshirts', gender='Men')
+    product = Product.objects.create(
+        title='Classic Polo', description='', gender='Men', category=category, price=499,
+        features='', care_instructions='',
+    )
+    size = Size.objects.create(name='M')
+    return [
+        ProductVariant.objects.create(
+            product=product, color=Color.objects.create(name=name, hex_code='#000000'), size=size, stock=stock,
+        )
+        for name, stock in zip(COLORS, stocks)
+    ]
+
+
+def stock_of(*variants):
+    return [ProductVariant.objects.get(pk=variant.pk).stock for variant in variants]
+
+
+@override_settings(STORE_TASKS_EAGER=True)
+class DecrementTests(TestCase):
+    def test_takes_every_line(self):
+        a, b = make_variants(5, 2)
+        inventory.decrement({a.pk: 3, b.pk: 2})
+        self.assertEqual(stock_of(a, b), [2, 0])
+
+    def test_all_or_nothing_naming_short_lines(self):
+        a, b, c = make_variants(5, 1, 0)
+        with self.assertRaises(inventory.OutOfStock) as caught:
+            inventory.decrement({a.pk: 2, b.pk: 2, c.pk: 1})
+        self.assertEqual(caught.exception.variant_ids, sorted([b.pk, c.pk]))
+        self.assertEqual(stock_of(a, b, c), [5, 1, 0])
+
+    def test_exact_stock_is_enough(self):
+        a, = make_variants(3)
+        inventory.decrement({a.pk: 3})
+        with self.assertRaises(inventory.OutOfStock):
+            inventory.decrement({a.pk: 1})
+        self.assertEqual(stock_of(a), [0])
+
+    def test_rejects_non_positive_quantities(self):
+        a, = make_variants(3)
+        for quantity in (0, -2):
+            with self.assertRaises(ValueError):
+                inventory.decrement({a.pk: quantity})
+        self.assertEqual(stock_of(a), [3])
+
+
+@override_settings(STORE_TASKS_EAGER=True)
+class ProductSerializerTests(TestCase):
+    def test_color_matrix_matches_the_per_color_queries(self):
+        category = Category.objects.create(name='Polo Tshirts', gender='Men')
+        product = Product.objects.create(
+            title='Classic Polo', description='', gender='Men', category=category, price=499,
+            features='', care_instructions='',
+        )
+        red, blue, green = (Color.objects.create(name=name, hex_code='#000000') for name in ('Red', 'Blue', 'Green'))
+        large, small = Size.objects.create(name='L', sort_order=2), Size.objects.create(name='S', sort_order=1)
+        for color in (green, red, blue):  # Variants created out of color id order
+            for size, extra in ((large, 50), (small, None)):
+                ProductVariant.objects.create(product=product, color=color, size=size, stock=3, price_override=extra)
+
+        # What get_colors / get_sizes returned when they queried per product and per color
+        expected_colors = [
+            {
+                'name': color.name,
+                'hex': color.hex_code,
+                'sizes': [
+                    {
+                        'size': variant.size.name, 'stock': variant.stock, 'inStock': variant.stock > 0,
+                        'price': product.price + (variant.price_override or 0), 'sku': variant.sku,
+                    }
+                    for variant in product.variants.filter(color=color).order_by('size__sort_order')
+                ],
+            }
+            for color in Color.objects.filter(productvariant__product=product).distinct()
+        ]
+        expected_sizes = [
+            {'size': size.name, 'inStock': True} for size in Size.objects.filter(productvariant__product=product).distinct()
+        ]
+
+        request = APIRequestFactory().get('/')
+        data = ProductSerializer(Product.objects.with_listing_data().get(pk=product.pk), context={'request': request}).data
+        self.assertEqual([color['name'] for color in data['colors']], ['Red', 'Blue', 'Green'])
+        self.assertEqual(data['colors'], expected_colors)
+        self.assertEqual(data['sizes'], expected_sizes)
+
+
+@override_settings(STORE_TASKS_EAGER=True)
+class RatingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.product = make_variants(1)[0].product
+        self.user = CustomUser.objects.create(email='reviewer@example.com')
+
+    def review(self, rating):
+        return Review.objects.create(product=self.product, user=self.user, user_name='r', rating=rating, comment='')
+
+    def test_review_writes_reuse_the_cached_prior(self):
+        self.review(4)  # The first review sets the prior
+        self.assertEqual(stats.prior_mean(), 4)
+        with CaptureQueriesContext(connection) as queries:
+            self.review(2)
+        self.assertFalse([query for query in queries if 'SUM(' in query['sql'].upper()], "summed every product")
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_avg, stats.bayesian_rating(6, 2, 4))
+        stats.refresh_ratings()  # The nightly refresh moves the prior
+        self.assertEqual(stats.prior_mean(), 3)
+
+
+@override_settings(STORE_TASKS_EAGER=True)
+class ProductBatchTests(TestCase):
+    def test_skips_inactive_products(self):
+        listed = make_variants(1)[0].product
+        hidden = Product.objects.create(
+            title='Unreleased Polo', description='', gender='Men', category=listed.category, price=499,
+            features='', care_instructions='', is_active=False,
+        )
+        response = self.client.get(f'/api/store/products/batch/?ids={hidden.pk},{listed.pk}&slugs={hidden.slug}')
+        self.assertEqual([product['id'] for product in response.json()], [str(listed.pk)])
+
+
+@override_settings(STORE_TASKS_EAGER=True, STORE_RESPONSE_CACHE={'products': 300})
+class ResponseCacheTests(TestCase):
+    URL = '/api/store/products/'
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_listing_changes_after_committed_variant_save(self):
+        variant, = make_variants(5)
+        first = self.client.get(self.URL)
+        self.assertTrue(first.json()[0]['inStock'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            variant.stock = 0
+            variant.save()
+            # Not committed yet: still the old version, so nothing stale can be stored under the new one
+            self.assertEqual(self.client.get(self.URL)['X-Cache'], 'HIT')
+
+        response = self.client.get(self.URL)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertFalse(response.json()[0]['inStock'])
+
+    def test_revalidation_after_committed_change_gets_the_new_body(self):
+        variant, = make_variants(5)
+        etag = self.client.get(self.URL)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            variant.stock = 0
+            variant.save()
+            # A GET inside the write's window keeps the old body under the old ETag
+            self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertFalse(response.json()[0]['inStock'])
+        self.assertEqual(self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+@override_settings(STORE_TASKS_EAGER=True)
+class ChangeLogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.variant, = make_variants(1)
+        self.product = self.variant.product
+        fuzzy.rebuild()
+        autocomplete.rebuild()
+
+    def rename(self, title):
+        self.product.title = title
+        self.product.save()
+
+    def test_vocabulary_follows_committed_renames_only(self):
+        class Abort(Exception):
+            pass
+
+        with self.assertRaises(Abort), transaction.atomic():
+            self.rename('Striped Henley')
+            raise Abort
+        self.assertIsNone(fuzzy.suggest('henly'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rename('Striped Henley')
+            self.assertIsNone(fuzzy.suggest('henly'))  # Not before the commit
+        self.assertEqual(fuzzy.suggest('henly'), 'henley')
+        self.assertIsNone(fuzzy.suggest('clasic'))  # The old title's words are gone
+
+    def test_autocomplete_follows_committed_changes_only(self):
+        class Abort(Exception):
+            pass
+
+        with self.assertRaises(Abort), transaction.atomic():
+            self.rename('Striped Henley')
+            raise Abort
+        self.assertEqual(autocomplete.lookup('henl'), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.sku = 'ZX-900-M'
+            self.variant.save()
+        self.assertEqual([s.label for s in autocomplete.lookup('zx 900')], ['ZX-900-M'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.variant.delete()
+        self.assertEqual(autocomplete.lookup('zx 900'), [])
+        self.assertEqual([s.kind for s in autocomplete.lookup('classic')], ['product'])
+
+    def test_bitmap_ids_stay_sorted_when_creates_commit_out_of_order(self):
+        bitmap.rebuild()
+        earlier, later = (
+            Product.objects.create(
+                title=title, description='', gender='Men', category=self.product.category, price=499,
+                features='', care_instructions='',
+            )
+            for title in ('Striped Henley', 'Ribbed Tank')
+        )
+        change_log._append([('product', later.pk)])
+        self.assertEqual(bitmap.get_index().product_ids[-1], later.pk)
+        change_log._append([('product', earlier.pk)])
+
+        index = bitmap.get_index()
+        self.assertEqual(index.product_ids, sorted(index.product_ids))
+        everything = index.match({})
+        self.assertEqual(index.product_ids_for(everything), [self.product.pk, earlier.pk, later.pk])
+        self.assertEqual(index.product_ids_for(everything, after_id=self.product.pk, limit=1), [earlier.pk])
+
+    def test_vocabulary_rebuilds_when_the_log_was_evicted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.rename('Striped Henley')
+        cache.clear()
+        self.assertEqual(fuzzy.suggest('henly'), 'henley')
+
+
+@override_settings(STORE_TASKS_EAGER=True)
+class ContentionTests(TransactionTestCase):
+    BUYERS = 200  # A flash sale on one SKU
+    STOCK = 50
+
+    def setUp(self):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            self.skipTest("needs fork()")
+        if connection.vendor == 'sqlite' and connection.creation.is_in_memory_db(connection.settings_dict['NAME']):
+            self.skipTest("forked buyers can't share an in-memory database")
+
+    def test_concurrent_buyers_never_oversell(self):
+        variant, = make_variants(self.STOCK)
+        outcomes, _ = inventory.race(variant.pk, self.BUYERS)
+
+        self.assertEqual(outcomes.count('sold'), self.STOCK, outcomes)
+        self.assertEqual(outcomes.count('refused'), self.BUYERS - self.STOCK, outcomes)
+        self.assertEqual(stock_of(variant), [0])
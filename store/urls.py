@@ -1,15 +1,22 @@
 from django.urls import path
 from .views import ProductListView, ProductDetailView, CategoryListView, CollectionListView,ProductReviewListCreateView
-from .views import ValidateCouponView, SiteConfigView
+from .views import ValidateCouponView, SiteConfigView, AutocompleteView, ProductFacetsView, ProductReviewSummaryView
+from .views import ProductBatchView, StockView, ProductFeedView
 urlpatterns = [
     # Products
     path('products/', ProductListView.as_view(), name='product-list'),
+    path('products/facets/', ProductFacetsView.as_view(), name='product-facets'),
+    path('products/batch/', ProductBatchView.as_view(), name='product-batch'),
     path('products/<slug:slug>/', ProductDetailView.as_view(), name='product-detail'),
-    
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+    path('stock/', StockView.as_view(), name='stock'),
+    path('feeds/products.<str:fmt>', ProductFeedView.as_view(), name='product-feed'),
+
     # Configuration
     path('categories/', CategoryListView.as_view(), name='category-list'),
     path('collections/', CollectionListView.as_view(), name='collection-list'),
     path('products/<slug:slug>/reviews/', ProductReviewListCreateView.as_view(), name='product-reviews'),
+    path('products/<slug:slug>/reviews/summary/', ProductReviewSummaryView.as_view(), name='product-review-summary'),
     path('validate-coupon/', ValidateCouponView.as_view(), name='validate_coupon'),
     path('config/', SiteConfigView.as_view(), name='site_config'),
 ]
\ No newline at end of file
@@ -1,64 +1,268 @@
 from rest_framework import generics, permissions, serializers
+from django.db import transaction
 from django.db.models import Q
-from .models import Product, Category, Collection, Review
-from .serializers import ProductSerializer, CategorySerializer, CollectionSerializer, ReviewSerializer
+from .models import Product, Category, Collection, ProductVariant, Review
+from .serializers import ProductSerializer, CategorySerializer, CollectionSerializer, ReviewSerializer, requested_fields
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from rest_framework import status
 from django.utils import timezone
+from datetime import datetime, timezone as dt_timezone
 from decimal import Decimal
 from .models import Coupon, SiteConfig
 from .serializers import SiteConfigSerializer
+from .pagination import KeysetPagination, ReviewPagination
+from .filters import ProductFilterMixin, split_param
+from .response_cache import CachedResponseMixin, ConditionalGetMixin, conditional_get
+from . import autocomplete, documents, feeds, response_cache
+from . import search as product_search
+from .facets import compute_facets
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+import hashlib
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views import View
+from core.storage import media_urls
 
 # --- 1. PRODUCTS API ---
-class ProductListView(generics.ListAPIView):
+class SparseFieldsMixin:
+    """`?view=card` / `?fields=a,b` for views serializing with ProductSerializer."""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['fields'] = requested_fields(self.request)
+        return context
+
+    def get_product_queryset(self):
+        return Product.objects.with_listing_data(requested_fields(self.request))
+
+class ProductListView(ConditionalGetMixin, CachedResponseMixin, SparseFieldsMixin, ProductFilterMixin, generics.ListAPIView):
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
+    cache_endpoint = 'products'
+    # Opt-in: `?page_size=24` (then follow `next`) switches to keyset pages
+    pagination_class = KeysetPagination
+
+    # ?sort=... -> ordering. Every option ends on `id` so keyset cursors are stable.
+    SORT_OPTIONS = {
+        'newest': ('-created_at', '-id'),
+        'price': ('price', 'id'),
+        '-price': ('-price', '-id'),
+        'rating': ('-rating_avg', '-id'),  # Denormalized columns, see store.stats
+        'popularity': ('-units_sold_30d', '-id'),
+        'id': ('id',),
+    }
+    DEFAULT_SORT = 'id'
 
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).prefetch_related('images', 'variants')
-        
-        # Filters
-        gender = self.request.query_params.get('gender')
-        if gender:
-            queryset = queryset.filter(gender__iexact=gender)
-
-        category = self.request.query_params.get('category')
-        if category:
-            queryset = queryset.filter(category__name__icontains=category)
-
-        collection = self.request.query_params.get('collection')
-        if collection:
-            queryset = queryset.filter(Q(collections__slug=collection) | Q(collections__title__icontains=collection))
-
-        badge = self.request.query_params.get('badge')
-        if badge:
-            if badge.lower() == 'new': queryset = queryset.filter(badge='NEW')
-            elif badge.lower() == 'bestseller': queryset = queryset.filter(badge='BESTSELLER')
-
-        search = self.request.query_params.get('search')
-        if search:
-            # 🔥 UPDATED SEARCH LOGIC
-            # 1. Search in Title
-            # 2. Search in Description
-            # 3. Search in Variant SKUs (Product Codes)
-            queryset = queryset.filter(
-                Q(title__icontains=search) | 
-                Q(description__icontains=search) |
-                Q(variants__sku__icontains=search) # <--- Added SKU Search
-            ).distinct() # Distinct is important because joining variants can duplicate rows
+        queryset = self.filter_products(self.get_product_queryset().filter(is_active=True))
 
-        return queryset
+        sort = self.request.query_params.get('sort')
+        if sort not in self.SORT_OPTIONS and self.search_ranking is not None:
+            return queryset  # Best match first, ordered by list()
+        self.search_ranking = None  # An explicit sort wins over relevance
+        return queryset.order_by(*self.SORT_OPTIONS.get(sort, self.SORT_OPTIONS[self.DEFAULT_SORT]))
+
+    def get_cache_namespaces(self):
+        return response_cache.listing_namespaces(self.request.query_params.get('gender'))
+
+    def bitmap_page_bounds(self):
+        sort = self.request.query_params.get('sort')
+        if self.SORT_OPTIONS.get(sort, self.SORT_OPTIONS[self.DEFAULT_SORT]) != ('id',):
+            return None
+        return self.paginator.page_bounds(self.request)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.search_ranking is None:
+            page = self.paginate_queryset(queryset)
+            rows = queryset if page is None else page
+        else:
+            page = self.paginator.paginate_ranking(queryset, self.search_ranking, request)
+            rows = product_search.order_by_ranking(queryset, self.search_ranking) if page is None else page
+        data = self.get_serializer(rows, many=True).data
+        response = Response(data) if page is None else self.get_paginated_response(data)
+        if self.did_you_mean:
+            # Plain-list responses can only carry it as a header; pages get it in the body too
+            response['X-Did-You-Mean'] = self.did_you_mean
+            if isinstance(response.data, dict):
+                response.data['didYouMean'] = self.did_you_mean
+        return response
+
+class ProductFacetsView(ProductFilterMixin, APIView):
+    """Facet counts for the same filters ProductListView accepts, cached per filter signature."""
+    permission_classes = [AllowAny]
+    CACHE_TIMEOUT = 300
 
-class ProductDetailView(generics.RetrieveAPIView):
-    queryset = Product.objects.all()
+    def get(self, request):
+        signature = [
+            (key, value) for key in self.FILTER_PARAMS for value in request.query_params.getlist(key) if value
+        ]
+        # Versioned like the listing, so catalog writes invalidate facets too
+        namespaces = response_cache.listing_namespaces(request.query_params.get('gender'))
+        cache_key = response_cache.cache_key('facets', namespaces, signature)
+        facets = cache.get(cache_key)
+        if facets is None:
+            products = self.filter_products(Product.objects.filter(is_active=True))
+            facets = compute_facets(products)
+            cache.set(cache_key, facets, self.CACHE_TIMEOUT)
+        return Response(facets)
+
+class ProductDetailView(ConditionalGetMixin, SparseFieldsMixin, generics.RetrieveAPIView):
     serializer_class = ProductSerializer
     lookup_field = 'slug'
 
+    def get_queryset(self):
+        return self.get_product_queryset()
+
+    def get_validators(self, request):
+        row = Product.objects.filter(slug=self.kwargs[self.lookup_field]).values_list(
+            'pk', 'updated_at', 'document__rendered_at'
+        ).first()
+        if row is None:
+            return None
+        pk, updated_at, rendered_at = row
+        origin = request.build_absolute_uri('/')
+        fields = requested_fields(request)
+        if rendered_at and fields is None and request.accepted_renderer.format == 'json':
+            # The stored document may lag a change by a moment; validate what is actually served
+            return ('document', pk, rendered_at, origin), rendered_at
+        stamps = response_cache.versions(['catalog', f'product:{pk}'])
+        modified = max(updated_at, datetime.fromtimestamp(max(stamps) / 1e9, tz=dt_timezone.utc))
+        return ('live', pk, updated_at, stamps, origin, fields, request.accepted_renderer.format), modified
+
+    def retrieve(self, request, *args, **kwargs):
+        # Serve the precomputed (full) document when there is one (see store/documents.py)
+        if request.accepted_renderer.format != 'json' or requested_fields(request) is not None:
+            return super().retrieve(request, *args, **kwargs)  # Never served from the document
+        body = documents.serve(kwargs[self.lookup_field], request)
+        if body is not None:
+            return HttpResponse(body, content_type='application/json')
+        response = super().retrieve(request, *args, **kwargs)
+        documents.schedule([int(response.data['id'])])  # None yet: render it for the next request
+        return response
+
+class ProductBatchView(SparseFieldsMixin, generics.ListAPIView):
+    """
+    `?ids=3,1,2` and/or `?slugs=a,b`: many products in one response, in the
+    order asked for (wishlists, recently viewed, cart suggestions). Unknown
+    and inactive ids/slugs are skipped, as in the listing. Same queries as one
+    listing page, whatever the size.
+    """
+    serializer_class = ProductSerializer
+    permission_classes = [AllowAny]
+    MAX_BATCH = 50
+
+    def requested_keys(self):
+        params = self.request.query_params
+        ids = split_param(params.get('ids'))
+        if not all(value.isdigit() for value in ids):
+            raise serializers.ValidationError({'ids': "Expected comma-separated product ids."})
+        keys = [('id', int(value)) for value in ids] + [('slug', value) for value in split_param(params.get('slugs'))]
+        keys = list(dict.fromkeys(keys))
+        if len(keys) > self.MAX_BATCH:
+            raise serializers.ValidationError(f"At most {self.MAX_BATCH} products per batch.")
+        return keys
+
+    def list(self, request, *args, **kwargs):
+        keys = self.requested_keys()
+        ids = [value for kind, value in keys if kind == 'id']
+        slugs = [value for kind, value in keys if kind == 'slug']
+        products = self.get_product_queryset().filter(Q(pk__in=ids) | Q(slug__in=slugs), is_active=True) if keys else []
+        by_key = {}
+        for product in products:
+            by_key[('id', product.pk)] = by_key[('slug', product.slug)] = product
+        ordered = list({id(by_key[key]): by_key[key] for key in keys if key in by_key}.values())
+        return Response(self.get_serializer(ordered, many=True).data)
+
+# --- 1b. AUTOCOMPLETE (served from memory, see store/autocomplete.py) ---
+class AutocompleteView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []  # No user lookup: a keystroke must not touch the DB
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', autocomplete.DEFAULT_LIMIT))
+        except ValueError:
+            limit = autocomplete.DEFAULT_LIMIT
+        limit = max(1, min(limit, autocomplete.MAX_LIMIT))
+
+        suggestions = autocomplete.lookup(query, gender=request.query_params.get('gender'), limit=limit)
+        return Response({
+            "query": query,
+            "results": [{"type": s.kind, "label": s.label, "slug": s.slug} for s in suggestions],
+        })
+
+# --- 1c. STOCK POLLING ---
+class StockView(APIView):
+    """
+    `?skus=A,B` and/or `?product_ids=1,2` -> {sku: stock}, for pages that
+    poll availability. One indexed query on ProductVariant, shared by all
+    pollers for STORE_RESPONSE_CACHE['stock'] seconds, with an ETag so
+    unchanged answers are a bodiless 304.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []  # Anonymous and identical for everyone
+    MAX_KEYS = 200
+
+    def get(self, request):
+        skus = sorted(set(split_param(request.query_params.get('skus'))))
+        product_ids = sorted(set(split_param(request.query_params.get('product_ids'))))
+        if not all(value.isdigit() for value in product_ids):
+            raise serializers.ValidationError({'product_ids': "Expected comma-separated product ids."})
+        if len(skus) + len(product_ids) > self.MAX_KEYS:
+            raise serializers.ValidationError(f"At most {self.MAX_KEYS} skus/products per request.")
+
+        timeout = getattr(settings, 'STORE_RESPONSE_CACHE', {}).get('stock') or 0
+        key = 'store:stock:' + hashlib.md5(repr((skus, product_ids)).encode()).hexdigest()
+        cached = cache.get(key) if timeout else None
+        if cached is None:
+            response_cache.record('stock', 'miss')
+            stock = dict(
+                ProductVariant.objects.filter(Q(sku__in=skus) | Q(product_id__in=product_ids))
+                .order_by('sku').values_list('sku', 'stock')
+            ) if skus or product_ids else {}
+            etag = '"%s"' % hashlib.md5(repr(sorted(stock.items())).encode()).hexdigest()
+            cached = (stock, etag)
+            if timeout:
+                cache.set(key, cached, timeout)
+        else:
+            response_cache.record('stock', 'hit')
+
+        stock, etag = cached
+        response = get_conditional_response(request, etag=etag) or Response(stock)
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=timeout)
+        return response
+
+class ProductFeedView(View):
+    """
+    /feeds/products.xml or .csv: every active variant for ad platforms,
+    streamed straight from a DB iterator (see store.feeds). A plain Django
+    view: the body isn't JSON, and DRF's content negotiation would turn
+    crawlers' Accept headers into 406s.
+    """
+
+    def get(self, request, fmt):
+        if fmt not in feeds.FORMATS:
+            raise Http404
+        encode, content_type = feeds.FORMATS[fmt]
+        items = feeds.items(media_urls(request))
+        response = StreamingHttpResponse(encode(items), content_type=content_type)
+        response['Content-Disposition'] = f'inline; filename="products.{fmt}"'
+        return response
+
 # --- 2. CATEGORIES API (UPDATED) ---
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = CategorySerializer
+    cache_endpoint = 'categories'
+
+    def get_cache_namespaces(self):
+        return ['categories']
 
     def get_queryset(self):
         queryset = Category.objects.all()
@@ -77,8 +281,12 @@ class CategoryListView(generics.ListAPIView):
         return queryset
 
 # --- 3. COLLECTIONS API (UPDATED) ---
-class CollectionListView(generics.ListAPIView):
+class CollectionListView(ConditionalGetMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = CollectionSerializer
+    cache_endpoint = 'collections'
+
+    def get_cache_namespaces(self):
+        return ['collections']
 
     def get_queryset(self):
         queryset = Collection.objects.filter(is_active=True)
@@ -94,10 +302,21 @@ class CollectionListView(generics.ListAPIView):
 class ProductReviewListCreateView(generics.ListCreateAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    # Opt-in: `?page_size=10` (then follow `next`); backed by review_product_created_idx
+    pagination_class = ReviewPagination
 
     def get_queryset(self):
         slug = self.kwargs['slug']
-        return Review.objects.filter(product__slug=slug).order_by('-created_at')
+        queryset = Review.objects.filter(product__slug=slug)
+
+        # ?rating=5 or ?rating=4,5
+        ratings = [value for value in split_param(self.request.query_params.get('rating')) if value.isdigit()]
+        if ratings:
+            queryset = queryset.filter(rating__in=ratings)
+        if self.request.query_params.get('with_comments') == 'true':
+            queryset = queryset.exclude(comment='')
+
+        return queryset.order_by('-created_at', '-id')
 
     def perform_create(self, serializer):
         if not self.request.user.is_authenticated:
@@ -105,7 +324,24 @@ class ProductReviewListCreateView(generics.ListCreateAPIView):
         slug = self.kwargs['slug']
         # Use get_object_or_404 is safer, but standard get is fine if slug is valid
         product = Product.objects.get(slug=slug)
-        serializer.save(product=product)
+        with transaction.atomic():  # The review and the product's rating counters commit together
+            serializer.save(product=product)
+
+class ProductReviewSummaryView(APIView):
+    """Star histogram, average and count for a product, straight from its counters."""
+    permission_classes = [AllowAny]
+
+    def get(self, request, slug):
+        product = get_object_or_404(
+            Product.objects.only('rating_sum', 'rating_count', *(f'ratings_{stars}' for stars in range(1, 6))),
+            slug=slug,
+        )
+        return Response({
+            "average": product.average_rating,
+            "count": product.review_count,
+            "histogram": {str(stars): count for stars, count in product.rating_histogram.items()},
+        })
+
 class ValidateCouponView(APIView):
     permission_classes = [AllowAny]
     
@@ -147,9 +383,13 @@ class ValidateCouponView(APIView):
             'message': f'Coupon applied successfully! You saved ₹{discount}'
         }, status=status.HTTP_200_OK)
 
-class SiteConfigView(APIView):
+class SiteConfigView(ConditionalGetMixin, APIView):
     permission_classes = [AllowAny]
-    
+
+    def get_cache_namespaces(self):
+        return ['config']
+
+    @conditional_get
     def get(self, request):
         config = SiteConfig.objects.first()
         if not config:
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class WebContentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'web_content'
+
+    def ready(self):
+        import web_content.signals  # Bumps the public content version on edits
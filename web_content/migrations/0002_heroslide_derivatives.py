@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_content', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='heroslide',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:57
+
+import core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web_content', '0002_heroslide_derivatives'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='brandfeature',
+            name='icon_image',
+            field=models.ImageField(help_text='Upload a small SVG or PNG icon (white color preferred)', storage=core.storage.upload_storage, upload_to='icons/'),
+        ),
+        migrations.AlterField(
+            model_name='brandstory',
+            name='image_1',
+            field=models.ImageField(help_text='First image (Men)', storage=core.storage.upload_storage, upload_to='brand/'),
+        ),
+        migrations.AlterField(
+            model_name='brandstory',
+            name='image_2',
+            field=models.ImageField(help_text='Second image (Women)', storage=core.storage.upload_storage, upload_to='brand/'),
+        ),
+        migrations.AlterField(
+            model_name='heroslide',
+            name='image',
+            field=models.ImageField(storage=core.storage.upload_storage, upload_to='hero/'),
+        ),
+    ]
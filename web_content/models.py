@@ -1,4 +1,5 @@
 from django.db import models
+from core.storage import upload_storage
 
 class AnnouncementBar(models.Model):
     text = models.CharField(max_length=255, help_text="Text to display on top bar")
@@ -8,7 +9,8 @@ class AnnouncementBar(models.Model):
         return self.text
 
 class HeroSlide(models.Model):
-    image = models.ImageField(upload_to='hero/')
+    image = models.ImageField(upload_to='hero/', storage=upload_storage)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)  # See store/derivatives.py
     title = models.CharField(max_length=100)
     subtitle = models.CharField(max_length=200)
     button_text = models.CharField(max_length=50, default="SHOP NOW")
@@ -25,8 +27,8 @@ class HeroSlide(models.Model):
 class BrandStory(models.Model):
     heading = models.CharField(max_length=100, default="OUR STORY")
     content = models.TextField()
-    image_1 = models.ImageField(upload_to='brand/', help_text="First image (Men)")
-    image_2 = models.ImageField(upload_to='brand/', help_text="Second image (Women)")
+    image_1 = models.ImageField(upload_to='brand/', storage=upload_storage, help_text="First image (Men)")
+    image_2 = models.ImageField(upload_to='brand/', storage=upload_storage, help_text="Second image (Women)")
     is_active = models.BooleanField(default=True)
 
     class Meta:
@@ -38,7 +40,7 @@ class BrandStory(models.Model):
 class BrandFeature(models.Model):
     """ The Icons under the story """
     title = models.CharField(max_length=50, help_text="e.g. On the move")
-    icon_image = models.ImageField(upload_to='icons/', help_text="Upload a small SVG or PNG icon (white color preferred)")
+    icon_image = models.ImageField(upload_to='icons/', storage=upload_storage, help_text="Upload a small SVG or PNG icon (white color preferred)")
     order = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
 
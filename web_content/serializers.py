@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from store.serializers import MediaImageField, SrcsetMixin
 from .models import AnnouncementBar, HeroSlide, BrandStory, BrandFeature
 
 class AnnouncementSerializer(serializers.ModelSerializer):
@@ -6,17 +7,25 @@ class AnnouncementSerializer(serializers.ModelSerializer):
         model = AnnouncementBar
         fields = ['text']
 
-class HeroSlideSerializer(serializers.ModelSerializer):
+class HeroSlideSerializer(SrcsetMixin, serializers.ModelSerializer):
+    image = MediaImageField()
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = HeroSlide
-        fields = ['id', 'image', 'title', 'subtitle', 'button_text', 'button_link']
+        fields = ['id', 'image', 'srcset', 'title', 'subtitle', 'button_text', 'button_link']
 
 class BrandStorySerializer(serializers.ModelSerializer):
+    image_1 = MediaImageField()
+    image_2 = MediaImageField()
+
     class Meta:
         model = BrandStory
         fields = ['heading', 'content', 'image_1', 'image_2']
 
 class BrandFeatureSerializer(serializers.ModelSerializer):
+    icon_image = MediaImageField()
+
     class Meta:
         model = BrandFeature
         fields = ['title', 'icon_image']
\ No newline at end of file
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from store import derivatives, response_cache
+from .models import AnnouncementBar, BrandFeature, BrandStory, HeroSlide
+
+
+# Validators for WebContentPublicView (see store/response_cache.py)
+@receiver([post_save, post_delete], sender=AnnouncementBar)
+@receiver([post_save, post_delete], sender=HeroSlide)
+@receiver([post_save, post_delete], sender=BrandStory)
+@receiver([post_save, post_delete], sender=BrandFeature)
+def bump_content_version(sender, **kwargs):
+    response_cache.bump('content')
+
+
+@receiver(post_save, sender=HeroSlide)
+def render_hero_derivatives(sender, instance, **kwargs):
+    derivatives.schedule(instance)
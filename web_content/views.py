@@ -1,15 +1,20 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from store.response_cache import ConditionalGetMixin, conditional_get
 from .models import AnnouncementBar, HeroSlide, BrandStory, BrandFeature
 from .serializers import (
     AnnouncementSerializer, HeroSlideSerializer, 
     BrandStorySerializer, BrandFeatureSerializer
 )
 
-class WebContentPublicView(APIView):
+class WebContentPublicView(ConditionalGetMixin, APIView):
     permission_classes = [AllowAny]
 
+    def get_cache_namespaces(self):
+        return ['content']  # Bumped by web_content.signals
+
+    @conditional_get
     def get(self, request):
         # Fetch active content
         announcement = AnnouncementBar.objects.filter(is_active=True).first()